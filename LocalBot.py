@@ -1,6 +1,8 @@
 import asyncio
 import json
 import random
+import re
+import shutil
 
 from moviepy.editor import *
 from dotenv import load_dotenv
@@ -8,7 +10,9 @@ from src.youtube_uploader import upload
 from src.story_generator import StoryGenerator
 from src.audion_generation.AudioGenerator import AudioGenerator
 from src.image_generation import ImageGenerator
+from src.image_generation.ImageIndex import ImageIndex
 from src.utils import Utils
+from src.utils.model_router import ModelRouter
 
 
 load_dotenv()
@@ -21,21 +25,46 @@ SILICON_FLOW_API_KEY = os.getenv("SILICON_FLOW_API_KEY")
 # Topic of the story
 TOPIC = "story of job from the bible"
 AUDIO_LANGUAGE = ["en"]  # Options: "english", "telugu"
+# "single"  → whole script in one completion
+# "outline" → short outline call, then scene batches expanded in parallel (faster, no truncation)
+SCRIPT_MODE = "single"
+# "draft" → quick low-res preview from cached assets, full render only on approval
+# "final" → full render + upload straight away
+RENDER_MODE = "final"
+# Reuse a previously generated image (any topic, same subject) when its scene text is at
+# least this similar (calibration in ImageIndex.py). Set to None to always generate fresh images.
+IMAGE_REUSE_THRESHOLD = 0.80
+# Render several deliverables in one pass (keys of Utils.OUTPUT_VARIANTS), e.g. ["1080p", "720p", "shorts"].
+# The first variant is uploaded as the main video, "shorts" is uploaded as a #Shorts cut-down.
+# None → single render at source resolution.
+OUTPUT_VARIANTS = None
+# Render each segment as soon as its image + audio exist instead of waiting for all assets.
+# Only used for RENDER_MODE="final" without OUTPUT_VARIANTS.
+STREAMING_PIPELINE = False
+# Look-ahead segments are generated in runs of AudioGenerator.EDGE_TTS_BATCH_SIZE (at most
+# STREAM_SEGMENTS_AHEAD) so Edge TTS keeps its batched sessions; the first render waits for one run.
+STREAM_SEGMENTS_AHEAD = 4   # Segments generated ahead of the renderer (backpressure)
+STREAM_RENDER_WORKERS = 1   # Concurrent segment encodes (x264 is already multi-threaded)
+DEFAULT_SUBJECT = "Biblical character, 3d animation style"  # Image subject for scripts without anchors
 # ==========================================
 # 1. SETUP FOLDERS
 # ==========================================
-def setup_folders(topic_name):
+def safe_topic_name(topic_name):
     # Clean up topic name for folder safety (Joseph's Coat -> Josephs_Coat)
-    safe_name = topic_name.replace(" ", "_").replace("'", "")
+    return topic_name.replace(" ", "_").replace("'", "")
+
+
+def setup_folders(topic_name, languages=None, root="Output"):
+    safe_name = safe_topic_name(topic_name)
     
-    base_dir = os.path.join("Output", safe_name)
+    base_dir = os.path.join(root, safe_name)
     img_dir = os.path.join(base_dir, "images")
     aud_dir = os.path.join(base_dir, "audio")
     
     os.makedirs(img_dir, exist_ok=True)
     os.makedirs(aud_dir, exist_ok=True)
     
-    for language in AUDIO_LANGUAGE:
+    for language in languages or AUDIO_LANGUAGE:
         lang_aud_dir = os.path.join(aud_dir, language)
         os.makedirs(lang_aud_dir, exist_ok=True)
     
@@ -43,83 +72,409 @@ def setup_folders(topic_name):
     return base_dir, img_dir, aud_dir
 
 
+def failure_marker(path):
+    return path + ".failed"
+
+
+def mark_failed(path, failed=True):
+    """
+    Records (or clears) that `path` only holds a placeholder, so the next run
+    retries it. Cleared markers are truncated rather than deleted, so pushing
+    them also clears the copy in an asset store.
+    """
+    marker = failure_marker(path)
+    if failed:
+        with open(marker, "w", encoding="utf-8") as f:
+            f.write("placeholder: generation failed\n")
+    elif os.path.exists(marker):
+        open(marker, "w").close()
+
+
+def is_cached(path):
+    """True if an asset from a previous run already exists on disk (placeholders don't count)."""
+    marker = failure_marker(path)
+    if os.path.exists(marker) and os.path.getsize(marker) > 0:
+        return False
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+
+def build_video_clips(segment_count, img_dir, aud_dir, language, draft=False, scale=1.0):
+    """Builds the per-segment Ken Burns clips (optionally with the draft profile)."""
+    indices = list(range(segment_count))
+    if draft:
+        indices = Utils.sample_segments(indices, Utils.DRAFT_PROFILE["sample_every"])
+
+    video_clips = []
+    for i in indices:
+        audio_path = os.path.join(aud_dir, language, AudioGenerator.audio_filename(i, language))
+        img_path = os.path.join(img_dir, f"image_{i}.png")
+        # --- C. Combine into Video Clip ---
+        if draft:
+            image_clip = Utils.video_clip_generation(
+                audio_path, img_path,
+                fps=Utils.DRAFT_PROFILE["fps"],
+                scale=Utils.DRAFT_PROFILE["scale"],
+                max_duration=Utils.DRAFT_PROFILE["max_segment_seconds"]
+            )
+        else:
+            image_clip = Utils.video_clip_generation(audio_path, img_path, scale=scale)
+        video_clips.append(image_clip)
+    return video_clips
+
+
+def load_or_generate_script(base_dir, topic, languages):
+    # Reuse the script of a previous run so cached audio/images still match it
+    script_path = os.path.join(base_dir, "script.json")
+    if os.path.exists(script_path):
+        with open(script_path, "r", encoding="utf-8") as f:
+            script = json.load(f)
+        print(f"♻️ Reusing cached script: {script_path}")
+    else:
+        if SCRIPT_MODE == "outline":
+            script = StoryGenerator.generate_story_script_outlined(topic, languages)
+        else:
+            script = StoryGenerator.generate_story_script(topic, languages)
+
+    # A cached script may predate some of the requested languages (a later job
+    # added one); translate its narration instead of voicing a placeholder.
+    complete = script
+    if complete and StoryGenerator.missing_script_languages(complete, languages):
+        complete = StoryGenerator.translate_script_languages(complete, languages)
+    if complete and StoryGenerator.missing_script_parts(complete, languages):
+        # Incomplete scripts were never rendered (flatten_script needs every part)
+        complete = StoryGenerator.complete_story_script(topic, languages, complete)
+    if not complete:
+        if script:
+            print(f"❌ Could not complete the script for {languages}.")
+        return None
+
+    if complete is not script or not os.path.exists(script_path):
+        with open(script_path, "w", encoding="utf-8") as f:
+            json.dump(complete, f, indent=4, ensure_ascii=False)
+    return complete
+
+
+def load_or_generate_metadata(base_dir, topic, script, languages):
+    """All-language YouTube metadata, stored in the run directory (metadata.json)."""
+    metadata_path = os.path.join(base_dir, "metadata.json")
+    metadata = {}
+    if os.path.exists(metadata_path):
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+    missing = [language for language in languages if not metadata.get(language)]
+    if missing:
+        metadata.update(StoryGenerator.generate_all_video_metadata(topic, script, missing))
+        with open(metadata_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=4, ensure_ascii=False)
+    return metadata
+
+
+def flatten_script(script):
+    """Scenes + lesson + blessing as one ordered segment list, plus the character anchors ({name: look})."""
+    all_segments = script['scenes'] + [script['lesson']] + [script['blessing']]
+    anchors = script.get('character_anchors')
+    return all_segments, anchors if isinstance(anchors, dict) else {}
+
+
+def image_subject(segment, anchors):
+    """
+    Anchors of the characters named in the segment's visual_action (the whole
+    cast when nobody is named), serialized in a stable order. Used both in the
+    image prompt and as the ImageIndex subject gate, so a look-alike scene of
+    another story (different cast) is never reused. "" when the script has no anchors.
+    """
+    action = segment.get('visual_action', "")
+    named = {name: look for name, look in anchors.items()
+             if re.search(rf"\b{re.escape(name)}\b", action, re.IGNORECASE)}
+    return "; ".join(f"{name}: {look}" for name, look in sorted((named or anchors).items()))
+
+
+def audio_jobs_for(all_segments, aud_dir, language):
+    """(text, audio_path) for every segment whose audio is not cached yet."""
+    audio_jobs = []
+    for i, segment in enumerate(all_segments):
+        audio_path = os.path.join(aud_dir, language, AudioGenerator.audio_filename(i, language))
+        if is_cached(audio_path):
+            continue
+        # 🔑 FIXED: Use 'narration_english' key
+        text = segment.get('narration', "Error in script text.").get(language, "Language not available.")
+        audio_jobs.append((text, audio_path))
+    return audio_jobs
+
+
+def build_image_prompt(segment, subject):
+    action = segment.get('visual_action', "Cinematic scene")
+    return (
+        f"{action}. "
+        f"Subject is {subject or DEFAULT_SUBJECT}. "
+        "Style: Hand-drawn 2D animation, cel shaded, epic cinematic lighting, "
+        "matte painting background, 4k resolution, masterpiece, intricate details. "
+        "NO 3D, NO photorealism."
+    )
+
+
+def generate_segment_image(segment, anchors, img_path, seed, image_index=None):
+    """Reuses an indexed near-duplicate or generates the image (black placeholder on failure)."""
+    subject = image_subject(segment, anchors)
+    final_prompt = build_image_prompt(segment, subject)
+    # Only the scene text is indexed; the shared style suffix would make every prompt look alike
+    scene_text = segment.get('visual_action', "Cinematic scene")
+    if not subject:
+        image_index = None  # Without anchors, different stories can't be told apart
+
+    if image_index is not None:
+        match = image_index.query(scene_text, subject, IMAGE_REUSE_THRESHOLD)
+        if match:
+            shutil.copyfile(match[0], img_path)
+            mark_failed(img_path, False)
+            print(f"   ♻️ Reusing indexed image (similarity {match[1]:.2f}).")
+            return True
+
+    success = ImageGenerator.generate_image_flux(final_prompt, img_path, seed=seed)
+    
+    if not success:
+        # Create black placeholder if API fails (marked, so the next run regenerates it)
+        ColorClip(size=(1024, 576), color=(0,0,0)).save_frame(img_path)
+        mark_failed(img_path)
+    else:
+        mark_failed(img_path, False)
+        if image_index is not None:
+            image_index.add(scene_text, img_path, subject)
+    return success
+
+
+# ==========================================
+# 3. STREAMING PIPELINE
+# ==========================================
+async def stream_production(all_segments, anchors, seed, base_dir, img_dir, aud_dir, languages):
+    """
+    Generates assets and renders segments concurrently.
+    - Generation starts in runs of consecutive segments, at most STREAM_SEGMENTS_AHEAD past the renderer.
+    - Ready (language, i) pairs go through a bounded queue to the render workers.
+    - Segment files are joined in order once every segment is encoded.
+    Returns {language: output_path}.
+    """
+    segment_dir = os.path.join(base_dir, "segments")
+    os.makedirs(segment_dir, exist_ok=True)
+
+    image_index = ImageIndex() if IMAGE_REUSE_THRESHOLD is not None else None
+    ahead = asyncio.Semaphore(STREAM_SEGMENTS_AHEAD)
+    render_queue = asyncio.Queue(maxsize=STREAM_SEGMENTS_AHEAD)
+    pending_renders = [len(languages)] * len(all_segments)
+    durations = {language: [None] * len(all_segments) for language in languages}
+
+    def segment_path(i, language):
+        return os.path.join(segment_dir, f"segment_{language}_{i}.mp4")
+
+    async def produce(indices):
+        """
+        Assets for a run of consecutive segments: images in parallel, narration as
+        ONE generate_many() per language, so Edge TTS batching and concurrent
+        translations still apply. A failed segment never reaches the renderer:
+        its durations stay None and its look-ahead slot is freed.
+        """
+        async def image(i):
+            img_path = os.path.join(img_dir, f"image_{i}.png")
+            if not is_cached(img_path):
+                await asyncio.to_thread(generate_segment_image, all_segments[i], anchors, img_path, seed, image_index)
+
+        async def narration(language):
+            jobs, owners = [], []
+            for i in indices:
+                audio_path = os.path.join(aud_dir, language, AudioGenerator.audio_filename(i, language))
+                if not is_cached(audio_path):
+                    jobs.append((all_segments[i].get('narration', {}).get(language, "Language not available."), audio_path))
+                    owners.append(i)
+            results = await AudioGenerator.generate_many(jobs, language)
+            return [i for i, ok in zip(owners, results) if not ok]
+
+        outcomes = await asyncio.gather(*map(image, indices), *map(narration, languages), return_exceptions=True)
+        failed = {}
+        for i, outcome in zip(indices, outcomes):
+            if isinstance(outcome, Exception):
+                failed[i] = f"image: {outcome}"
+        for language, outcome in zip(languages, outcomes[len(indices):]):
+            for i in (indices if isinstance(outcome, Exception) else outcome):
+                failed.setdefault(i, f"[{language}] narration synthesis failed")
+
+        for i in indices:
+            if i in failed:
+                print(f"   ❌ Segment {i + 1} assets failed: {failed[i]}")
+                ahead.release()
+                continue
+            for language in languages:
+                await render_queue.put((language, i))  # Blocks while the renderer is behind
+
+    async def feed():
+        producers = []
+        batch = max(1, min(AudioGenerator.EDGE_TTS_BATCH_SIZE, STREAM_SEGMENTS_AHEAD))
+        for first in range(0, len(all_segments), batch):
+            indices = list(range(first, min(first + batch, len(all_segments))))
+            for _ in indices:
+                await ahead.acquire()
+            producers.append(asyncio.create_task(produce(indices)))
+        await asyncio.gather(*producers)
+
+    async def render_worker():
+        while True:
+            language, i = await render_queue.get()
+            try:
+                audio_path = os.path.join(aud_dir, language, AudioGenerator.audio_filename(i, language))
+                img_path = os.path.join(img_dir, f"image_{i}.png")
+                durations[language][i] = await asyncio.to_thread(
+                    Utils.render_segment, audio_path, img_path, segment_path(i, language)
+                )
+                print(f"   🎞️ [{language}] Segment {i + 1}/{len(all_segments)} encoded")
+            except Exception as e:
+                print(f"   ❌ [{language}] Segment {i + 1} failed to render: {e}")
+            finally:
+                pending_renders[i] -= 1
+                if pending_renders[i] == 0:
+                    ahead.release()
+                render_queue.task_done()
+
+    workers = [asyncio.create_task(render_worker()) for _ in range(STREAM_RENDER_WORKERS)]
+    try:
+        await feed()
+        await render_queue.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        if image_index is not None:
+            image_index.save()
+
+    outputs = {}
+    for language in languages:
+        if None in durations[language]:
+            print(f"❌ [{language}] Some segments failed to render. Skipping.")
+            continue
+        tracks = [
+            (os.path.join(aud_dir, language, AudioGenerator.audio_filename(i, language)), duration)
+            for i, duration in enumerate(durations[language])
+        ]
+        outputs[language] = await asyncio.to_thread(
+            Utils.concat_segments,
+            [segment_path(i, language) for i in range(len(all_segments))],
+            tracks,
+            os.path.join(base_dir, f"Final_Video_{language}.mp4")
+        )
+    return outputs
+
+
 # ==========================================
 # 4. MAIN PIPELINE (The Glue)
 # ==========================================
-async def main():
-    base_dir, img_dir, aud_dir = setup_folders(TOPIC)
+async def publish(topic, language, output_path, shorts_path, script, metadata_future, aud_dir):
+    # --- 4. Upload to YouTube ---
+    meta_data = (await metadata_future).get(language)
+    if not meta_data:
+        meta_data = StoryGenerator.generate_video_metadata(topic, script, language)
+    print(f"📝 Video Metadata: {meta_data}")
+    with open(os.path.join(aud_dir,language,"meta_data_debug.txt"), "w", encoding="utf-8") as f:
+        json.dump(meta_data, f,indent=4)
+
+    uploaded = upload.upload_video_to_youtube(output_path, meta_data) is not None
+    if shorts_path:
+        shorts_meta = dict(meta_data, title=f"{meta_data.get('title', '')[:90]} #Shorts")
+        uploaded = upload.upload_video_to_youtube(shorts_path, shorts_meta) is not None and uploaded
+    return uploaded
+
+
+async def main(topic=TOPIC, languages=None):
+    """
+    Produces and uploads the story in every language. Returns {language: reason}
+    for each language that was NOT published (empty dict = full success).
+    """
+    languages = languages or AUDIO_LANGUAGE
+    failed = {}
+    base_dir, img_dir, aud_dir = setup_folders(topic, languages)
     
     # --- 1. Get Script ---
-    script = StoryGenerator.generate_story_script(TOPIC, AUDIO_LANGUAGE)
+    script = load_or_generate_script(base_dir, topic, languages)
     print(f"Script: {script}")
     
       
     # 🛑 CRITICAL CHECK: Stop if script is None
     if not script:
         print("❌ Script generation failed. Exiting.")
-        return
+        return {language: "script generation failed" for language in languages}
+
+    # --- Metadata: runs in the background while assets are generated ---
+    metadata_future = asyncio.get_running_loop().run_in_executor(
+        None, load_or_generate_metadata, base_dir, topic, script, languages
+    )
 
     # Flatten script
-    all_segments = script['scenes'] + [script['lesson']] + [script['blessing']]
-    anchor = script.get('character_anchor', "Biblical character, 3d animation style")
+    all_segments, anchors = flatten_script(script)
     story_seed = random.randint(1, 999999)
     
     
     print(f"🚀 Starting Production: {len(all_segments)} Segments")
-    video_clips = []
 
-    for language in AUDIO_LANGUAGE:   
-        for i, segment in enumerate(all_segments):
-            print(f"\n[Segment {i+1}]")
-            
-            # --- A. Audio Generation ---
-            audio_path = os.path.join(aud_dir, language, f"audio_{i}.mp3")
-            # 🔑 FIXED: Use 'narration_english' key
-            text = segment.get('narration', "Error in script text.").get(language, "Language not available.")
-            await AudioGenerator.generate(text, audio_path, language)
+    if STREAMING_PIPELINE and RENDER_MODE == "final" and not OUTPUT_VARIANTS:
+        outputs = await stream_production(
+            all_segments, anchors, story_seed, base_dir, img_dir, aud_dir, languages
+        )
+        for language in languages:
+            if language not in outputs:
+                failed[language] = "segments failed to render"
+            elif not await publish(topic, language, outputs[language], None, script, metadata_future, aud_dir):
+                failed[language] = "upload failed"
+        ModelRouter.report()
+        return failed
+
+    for language in languages:   
+        # --- A. Audio Generation (concurrent, batched per language) ---
+        audio_jobs = audio_jobs_for(all_segments, aud_dir, language)
+        print(f"\n🎙️ [{language}] {len(audio_jobs)} segments to synthesize "
+              f"({len(all_segments) - len(audio_jobs)} cached)")
+        await AudioGenerator.generate_many(audio_jobs, language)
     
     
 
+    image_index = ImageIndex() if IMAGE_REUSE_THRESHOLD is not None else None
+
     for i, segment in enumerate(all_segments):
         # --- B. Image Generation ---
         img_path = os.path.join(img_dir, f"image_{i}.png")
-        action = segment.get('visual_action', "Cinematic scene")
-        
-        final_prompt = (
-            f"{action}. "
-            f"Subject is {anchor}. "
-            "Style: Hand-drawn 2D animation, cel shaded, epic cinematic lighting, "
-            "matte painting background, 4k resolution, masterpiece, intricate details. "
-            "NO 3D, NO photorealism."
-        )
-        
-        success = ImageGenerator.generate_image_flux(final_prompt, img_path, seed=story_seed)
-        
-        if not success:
-            # Create black placeholder if API fails
-            ColorClip(size=(1024, 576), color=(0,0,0)).save_frame(img_path)
+        if is_cached(img_path):
+            continue
+        generate_segment_image(segment, anchors, img_path, story_seed, image_index)
 
+    if image_index is not None:
+        image_index.save()
         
     
-    for language in AUDIO_LANGUAGE:
-        video_clips = []
-        for i, segment in enumerate(all_segments):
-            audio_path = os.path.join(aud_dir, language, f"audio_{i}.mp3")
-            img_path = os.path.join(img_dir, f"image_{i}.png")
-            # --- C. Combine into Video Clip ---
-            image_clip = Utils.video_clip_generation(audio_path, img_path)
-            video_clips.append(image_clip)
-               
+    for language in languages:
+        if RENDER_MODE == "draft":
+            draft_clips = build_video_clips(len(all_segments), img_dir, aud_dir, language, draft=True)
+            draft_path = Utils.assemble_video(draft_clips, base_dir, language, draft=True)
+            answer = input(f"👀 Review {draft_path}. Approve final render for [{language}]? [y/N] ")
+            if answer.strip().lower() not in ("y", "yes"):
+                print(f"⏭️ Skipping final render/upload for [{language}].")
+                failed[language] = "draft rejected"
+                continue
+
         # assemble the final video after all segments
-        output_path = Utils.assemble_video(video_clips, base_dir, language)
-
-        # --- 4. Upload to YouTube ---
-        meta_data = StoryGenerator.generate_video_metadata(TOPIC, script, language)
-        print(f"📝 Video Metadata: {meta_data}")
-        with open(os.path.join(aud_dir,language,"meta_data_debug.txt"), "w", encoding="utf-8") as f:
-            json.dump(meta_data, f,indent=4)
-            
-        upload.upload_video_to_youtube(output_path, meta_data)
+        shorts_path = None
+        if OUTPUT_VARIANTS:
+            # Shared frame at the largest landscape size; variants only downscale/crop
+            scale = Utils.variant_base_scale(os.path.join(img_dir, "image_0.png"), OUTPUT_VARIANTS)
+            video_clips = build_video_clips(len(all_segments), img_dir, aud_dir, language, scale=scale)
+            outputs = Utils.assemble_variants(video_clips, base_dir, language, OUTPUT_VARIANTS)
+            output_path = outputs[OUTPUT_VARIANTS[0]]
+            if OUTPUT_VARIANTS[0] != "shorts":
+                shorts_path = outputs.get("shorts")
+        else:
+            video_clips = build_video_clips(len(all_segments), img_dir, aud_dir, language)
+            output_path = Utils.assemble_video(video_clips, base_dir, language)
+
+        if not await publish(topic, language, output_path, shorts_path, script, metadata_future, aud_dir):
+            failed[language] = "upload failed"
+
+    ModelRouter.report()
+    return failed
         
     
 
@@ -1,10 +1,14 @@
 import os
-import requests
 import json
 import re
 import edge_tts
 import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from src.utils.rest_api import RestAPI
+from src.utils.model_router import ModelRouter
+from src.audion_generation import mp3_frames
+from src.audion_generation import sentence_shards
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,6 +18,43 @@ class AudioGenerator:
     
     VOICE_PROFILE_CACHE = {}
 
+    # Edge TTS voices per language
+    EDGE_VOICES = {
+        "te": "te-IN-MohanNeural",       # Telugu
+        "hi": "hi-IN-MadhurNeural",      # Hindi
+        "ta": "ta-IN-ValluvarNeural",    # Tamil
+        "ml": "ml-IN-MidhunNeural"       # Malayalam
+    }
+    EDGE_TTS_CONCURRENCY = 4   # Max simultaneous Edge TTS websocket sessions
+    EDGE_TTS_BATCH_SIZE = 4    # Consecutive segments synthesized per session (1 = no batching)
+
+    # Narration is kept in the provider's best lossless/native format and only
+    # AAC-encoded once at the final mux (see Utils.encode_narration).
+    # Fish Audio → 16-bit PCM WAV; Edge TTS only streams mp3, so it stays as-is.
+    FISH_RESPONSE_FORMAT = "wav"
+    FISH_SAMPLE_RATE = 44100
+    EDGE_SAMPLE_RATE = 24000   # Edge TTS default output: 24 kHz, 48 kbit/s mono mp3
+    EDGE_BITRATE = "48k"
+
+    # Sentence sharding: narration longer than SHARD_MIN_CHARS is split at sentence
+    # ends, the sentences are synthesized concurrently and stitched back together
+    # with SENTENCE_GAP_SECONDS of silence between them.
+    SENTENCE_SHARDING = True
+    SHARD_MIN_CHARS = 200
+    SHARD_MIN_SENTENCE_CHARS = 40  # Shorter sentences are merged into their neighbour
+    SHARD_CONCURRENCY = 4
+    SENTENCE_GAP_SECONDS = 0.25
+    _SILENCE_CACHE = {}
+
+    @staticmethod
+    def audio_extension(language_code):
+        return AudioGenerator.FISH_RESPONSE_FORMAT if language_code == "en" else "mp3"
+
+    @staticmethod
+    def audio_filename(index, language_code):
+        """File name the renderer expects for segment `index` in `language_code`."""
+        return f"audio_{index}.{AudioGenerator.audio_extension(language_code)}"
+
     # ======================================================
     # 🔹 EXISTING LOGIC (FOR ENGLISH / FISH AUDIO)
     # ======================================================
@@ -44,8 +85,8 @@ class AudioGenerator:
             "model": "fishaudio/fish-speech-1.5",
             "input": text,
             "voice": voice_profile["voice"],
-            "response_format": "mp3",
-            "sample_rate": 32000,
+            "response_format": AudioGenerator.FISH_RESPONSE_FORMAT,
+            "sample_rate": AudioGenerator.FISH_SAMPLE_RATE,
             "stream": False,
             "speed": voice_profile["speed"],
             "gain": 0.0
@@ -71,24 +112,29 @@ class AudioGenerator:
     # ======================================================
     @staticmethod
     def _translate_text(text, target_lang):
-        """Translates English text to Target Language using DeepSeek"""
+        """Translates English text to Target Language (small model tier first, see ModelRouter)"""
         print(f"   🔄 Translating to {target_lang}...", end="", flush=True)
         
-        url = "https://api.siliconflow.com/v1/chat/completions"
-        system_prompt = f"Translate the following text to {target_lang}. Output ONLY the translated text. No notes."
-        
-        payload = {
-            "model": "deepseek-ai/DeepSeek-V3",
-            "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": text}],
-            "temperature": 0.3,
-            "max_tokens": 1024
-        }
-        
-        try:
-            response = requests.post(url, json=payload, headers={"Authorization": f"Bearer {SILICON_FLOW_API_KEY}", "Content-Type": "application/json"})
-            return response.json()['choices'][0]['message']['content'].strip()
-        except:
+        # Static system prompt (shared cacheable prefix), target language goes in the user message
+        system_prompt = "Translate the user's text to the target language code given. Output ONLY the translated text. No notes."
+
+        def _validate(content):
+            content = content.strip()
+            if not content or content == text.strip():
+                raise ValueError("empty or untranslated output")
+            return content
+
+        response = ModelRouter.chat(
+            "translate",
+            [{"role": "system", "content": system_prompt},
+             {"role": "user", "content": f"Target language: {target_lang}\nText:\n{text}"}],
+            validate=_validate,
+            temperature=0.3,
+            max_tokens=1024
+        )
+        if response is None:
             return text # Fallback to original text
+        return response["result"]
 
     @staticmethod
     async def _generate_other_edge(text, output_path, language):
@@ -97,25 +143,261 @@ class AudioGenerator:
         # 1. Translate Text First!
         translated_text = AudioGenerator._translate_text(text, language)
         
-        # 2. Select Voice
-        voices = {
-            "te": "te-IN-MohanNeural",       # Telugu
-            "hi": "hi-IN-MadhurNeural",      # Hindi
-            "ta": "ta-IN-ValluvarNeural",    # Tamil
-            "ml": "ml-IN-MidhunNeural"       # Malayalam
-        }
-        voice = voices.get(language, "te-IN-MohanNeural")
-        
+        # 2. Synthesize (voice picked per language in _generate_edge_sharded)
         print(f"   🎙️ Generating {language} Audio (Edge TTS)...", end="", flush=True)
         try:
-            communicate = edge_tts.Communicate(translated_text, voice)
-            await communicate.save(output_path)
+            await AudioGenerator._generate_edge_sharded(translated_text, output_path, language)
             print(" Done!")
             return True
         except Exception as e:
             print(f" ❌ EdgeTTS Error: {e}")
             return False
 
+    # ======================================================
+    # 🔹 BATCHED EDGE TTS (ONE SESSION, MANY SEGMENTS)
+    # ======================================================
+    @staticmethod
+    def _normalize_for_alignment(text):
+        """Letters/digits only, so boundary text and segment text compare by length."""
+        return "".join(ch for ch in text if ch.isalnum())
+
+    @staticmethod
+    def _segment_cut_times(texts, boundaries):
+        """
+        Maps WordBoundary/SentenceBoundary events back to the segments they came
+        from (by consumed character count) and returns the split times between
+        consecutive segments, or None if the alignment is not trustworthy.
+        """
+        targets = []
+        total = 0
+        for text in texts:
+            total += len(AudioGenerator._normalize_for_alignment(text))
+            targets.append(total)
+
+        spans = [[None, None] for _ in texts]  # [first_start, last_end] per segment
+        consumed = 0
+        segment = 0
+        for start, end, text in boundaries:
+            while segment < len(texts) - 1 and consumed >= targets[segment]:
+                segment += 1
+            if spans[segment][0] is None:
+                spans[segment][0] = start
+            spans[segment][1] = end
+            consumed += len(AudioGenerator._normalize_for_alignment(text))
+
+        if any(a is None for a, _ in spans) or abs(consumed - total) > 0.1 * max(total, 1):
+            return None
+
+        # Cut in the middle of the pause between two segments
+        return [(spans[k][1] + spans[k + 1][0]) / 2 for k in range(len(texts) - 1)]
+
+    @staticmethod
+    async def _generate_edge_batch(texts, output_paths, language):
+        """
+        Synthesizes consecutive (already translated) segments in ONE Edge TTS
+        session and splits the mp3 stream into per-segment files using the
+        boundary timing events. Falls back to one session per segment.
+        """
+        voice = AudioGenerator.EDGE_VOICES.get(language, "te-IN-MohanNeural")
+
+        if len(texts) > 1:
+            # Every segment must end a sentence so boundaries never straddle two segments
+            joined = " ".join(
+                t.strip() if re.search(r"[.!?।॥]$", t.strip()) else t.strip() + "."
+                for t in texts
+            )
+            audio = bytearray()
+            boundaries = []
+            try:
+                communicate = edge_tts.Communicate(joined, voice)
+                async for chunk in communicate.stream():
+                    if chunk["type"] == "audio":
+                        audio += chunk["data"]
+                    elif chunk["type"] in ("WordBoundary", "SentenceBoundary"):
+                        start = chunk["offset"] / 1e7  # 100 ns units
+                        boundaries.append((start, start + chunk["duration"] / 1e7, chunk["text"]))
+
+                cut_times = AudioGenerator._segment_cut_times(texts, boundaries)
+                if cut_times is not None:
+                    for path, data in zip(output_paths, mp3_frames.split_at(bytes(audio), cut_times)):
+                        with open(path, "wb") as f:
+                            f.write(data)
+                    print(f"   🎙️ {language} batch of {len(texts)} segments Done!")
+                    return [True] * len(texts)
+                print(f"   ⚠️ Could not align {language} batch, synthesizing segments one by one.")
+            except Exception as e:
+                print(f"   ⚠️ EdgeTTS batch Error: {e}. Synthesizing segments one by one.")
+
+        results = []
+        for text, path in zip(texts, output_paths):
+            try:
+                await AudioGenerator._generate_edge_sharded(text, path, language)
+                results.append(True)
+            except Exception as e:
+                print(f"   ❌ EdgeTTS Error: {e}")
+                results.append(False)
+        return results
+
+    @staticmethod
+    def _partial_path(output_path):
+        root, ext = os.path.splitext(output_path)
+        return f"{root}.partial{ext}"
+
+    @staticmethod
+    def _publish(partial_path, output_path, ok):
+        """Renames a finished file into place; a failed one is removed, never left truncated."""
+        if ok and os.path.exists(partial_path) and os.path.getsize(partial_path) > 0:
+            os.replace(partial_path, output_path)
+            return True
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        return False
+
+    @staticmethod
+    async def generate_many(jobs, language="en"):
+        """
+        Generates audio for many segments at once.
+        jobs: list of (text, output_path). Returns a list of success flags in job order.
+        - English: Fish Audio requests run concurrently (bounded).
+        - Other: translations run concurrently, then consecutive segments are
+          batched into shared Edge TTS sessions, at most EDGE_TTS_CONCURRENCY at a time.
+        Files are written under a .partial name and renamed once complete, so a
+        failed or interrupted session never leaves a truncated file in place.
+        """
+        if not jobs:
+            return []
+        partial_jobs = [(text, AudioGenerator._partial_path(path)) for text, path in jobs]
+        results = await AudioGenerator._generate_many(partial_jobs, language)
+        return [AudioGenerator._publish(partial, path, ok)
+                for (_, partial), (_, path), ok in zip(partial_jobs, jobs, results)]
+
+    @staticmethod
+    async def _generate_many(jobs, language):
+        semaphore = asyncio.Semaphore(AudioGenerator.EDGE_TTS_CONCURRENCY)
+
+        if language == "en":
+            async def _fish(text, path):
+                async with semaphore:
+                    return await asyncio.to_thread(AudioGenerator._generate_english_sharded, text, path)
+            return list(await asyncio.gather(*(_fish(t, p) for t, p in jobs)))
+
+        async def _translate(text):
+            async with semaphore:
+                return await asyncio.to_thread(AudioGenerator._translate_text, text, language)
+        translated = await asyncio.gather(*(_translate(t) for t, _ in jobs))
+
+        # Long (sentence-sharded) segments get their own group, the rest are batched
+        size = max(1, AudioGenerator.EDGE_TTS_BATCH_SIZE)
+        groups = []
+        run = []
+        for k, text in enumerate(translated):
+            if AudioGenerator._sentence_shards(text) is not None:
+                if run:
+                    groups.append(run)
+                    run = []
+                groups.append([k])
+                continue
+            run.append(k)
+            if len(run) == size:
+                groups.append(run)
+                run = []
+        if run:
+            groups.append(run)
+
+        async def _batch(indices):
+            async with semaphore:
+                return await AudioGenerator._generate_edge_batch(
+                    [translated[k] for k in indices], [jobs[k][1] for k in indices], language
+                )
+        batch_results = await asyncio.gather(*(_batch(g) for g in groups))
+        return [ok for results in batch_results for ok in results]
+
+    # ======================================================
+    # 🔹 SENTENCE-SHARDED SYNTHESIS (LONG NARRATION)
+    # ======================================================
+    @staticmethod
+    def _sentence_shards(text):
+        """Sentence shards for long text, or None when the text should go in one request."""
+        if not AudioGenerator.SENTENCE_SHARDING or len(text) < AudioGenerator.SHARD_MIN_CHARS:
+            return None
+        shards = sentence_shards.split_sentences(text, AudioGenerator.SHARD_MIN_SENTENCE_CHARS)
+        return shards if len(shards) > 1 else None
+
+    @staticmethod
+    def _generate_english_sharded(text, output_path):
+        """Fish Audio per sentence (concurrent), joined into one WAV."""
+        shards = AudioGenerator._sentence_shards(text)
+        if shards is None:
+            return AudioGenerator._generate_english_fish(text, output_path)
+
+        part_paths = [f"{output_path}.part{k}.wav" for k in range(len(shards))]
+        with ThreadPoolExecutor(max_workers=AudioGenerator.SHARD_CONCURRENCY) as pool:
+            results = list(pool.map(AudioGenerator._generate_english_fish, shards, part_paths))
+
+        try:
+            if all(results):
+                sentence_shards.join_wav(part_paths, output_path, AudioGenerator.SENTENCE_GAP_SECONDS)
+                print(f"   🧩 Stitched {len(shards)} sentences into {os.path.basename(output_path)}")
+                return True
+            print("   ⚠️ Some sentences failed, synthesizing the segment in one request.")
+        except Exception as e:
+            print(f"   ⚠️ Could not stitch sentences ({e}), synthesizing the segment in one request.")
+        finally:
+            for path in part_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+        return AudioGenerator._generate_english_fish(text, output_path)
+
+    @staticmethod
+    def _mp3_silence(seconds):
+        """Encoded silence matching the Edge TTS stream format (cached per duration)."""
+        if seconds <= 0:
+            return b""
+        if seconds not in AudioGenerator._SILENCE_CACHE:
+            from moviepy.config import get_setting
+            result = subprocess.run([
+                get_setting("FFMPEG_BINARY"), "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i", f"anullsrc=r={AudioGenerator.EDGE_SAMPLE_RATE}:cl=mono",
+                "-t", str(seconds), "-c:a", "libmp3lame", "-b:a", AudioGenerator.EDGE_BITRATE,
+                "-write_xing", "0", "-id3v2_version", "0", "-f", "mp3", "pipe:1"
+            ], capture_output=True, check=True)
+            AudioGenerator._SILENCE_CACHE[seconds] = result.stdout
+        return AudioGenerator._SILENCE_CACHE[seconds]
+
+    @staticmethod
+    async def _generate_edge_sharded(text, output_path, language):
+        """
+        Edge TTS session per sentence (concurrent). The mp3 streams are joined
+        frame by frame with encoded silence between them, no re-encode.
+        Expects already translated text.
+        """
+        voice = AudioGenerator.EDGE_VOICES.get(language, "te-IN-MohanNeural")
+        shards = AudioGenerator._sentence_shards(text)
+        if shards is None:
+            await edge_tts.Communicate(text, voice).save(output_path)
+            return True
+
+        semaphore = asyncio.Semaphore(AudioGenerator.SHARD_CONCURRENCY)
+
+        async def _sentence(sentence):
+            async with semaphore:
+                audio = bytearray()
+                async for chunk in edge_tts.Communicate(sentence, voice).stream():
+                    if chunk["type"] == "audio":
+                        audio += chunk["data"]
+                return bytes(audio)
+
+        parts = await asyncio.gather(*(_sentence(s) for s in shards))
+        try:
+            gap = AudioGenerator._mp3_silence(AudioGenerator.SENTENCE_GAP_SECONDS)
+        except Exception as e:
+            print(f"   ⚠️ Could not encode sentence gap ({e}), joining without pauses.")
+            gap = b""
+        with open(output_path, "wb") as f:
+            f.write(mp3_frames.join(parts, gap))
+        print(f"   🧩 Stitched {len(shards)} {language} sentences into {os.path.basename(output_path)}")
+        return True
+
     # ======================================================
     # 🔹 UNIFIED ENTRY POINT
     # ======================================================
@@ -126,9 +408,11 @@ class AudioGenerator:
         - If English: Uses your original Fish Audio code.
         - If Other: Uses Edge TTS (Async).
         """
+        partial_path = AudioGenerator._partial_path(output_path)
         if language == "en":
-            # Call the synchronous Fish Audio function
-            return AudioGenerator._generate_english_fish(text, output_path)
+            # Call the synchronous Fish Audio function (sentence-sharded when long)
+            ok = AudioGenerator._generate_english_sharded(text, partial_path)
         else:
             # Call the async Edge TTS function
-            return await AudioGenerator._generate_other_edge(text, output_path, language)
\ No newline at end of file
+            ok = await AudioGenerator._generate_other_edge(text, partial_path, language)
+        return AudioGenerator._publish(partial_path, output_path, ok)
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Minimal MPEG audio (mp3) frame walker.
+
+Edge TTS streams constant-bitrate MPEG-2 Layer III (24 kHz, 48 kbit/s), so a
+batched synthesis can be cut into per-segment files on frame boundaries
+without decoding or re-encoding anything.
+"""
+
+# Layer III bitrates (kbit/s) by bitrate index
+_BITRATES = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def _skip_id3(data):
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return 10 + size
+
+
+def _parse_header(data, i):
+    """Returns (frame_length_bytes, duration_seconds) for a Layer III header at i, else None."""
+    if i + 4 > len(data) or data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+        return None
+
+    version = (data[i + 1] >> 3) & 0x3
+    layer = (data[i + 1] >> 1) & 0x3
+    bitrate_index = (data[i + 2] >> 4) & 0xF
+    rate_index = (data[i + 2] >> 2) & 0x3
+    padding = (data[i + 2] >> 1) & 0x1
+
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if version == 3:
+        bitrate = _BITRATES["mpeg1"][bitrate_index] * 1000
+        return 144 * bitrate // sample_rate + padding, 1152 / sample_rate
+
+    bitrate = _BITRATES["mpeg2"][bitrate_index] * 1000
+    return 72 * bitrate // sample_rate + padding, 576 / sample_rate
+
+
+def iter_frames(data):
+    """Yields (start_byte, end_byte, start_seconds) for every mp3 frame in data."""
+    i = _skip_id3(data)
+    t = 0.0
+    while i < len(data):
+        header = _parse_header(data, i)
+        if header is None:
+            i += 1  # Resync on the next byte
+            continue
+        length, duration = header
+        yield i, min(i + length, len(data)), t
+        i += length
+        t += duration
+
+
+def split_at(data, cut_times):
+    """
+    Splits an mp3 byte stream at the given times (seconds, ascending).
+    Returns len(cut_times) + 1 byte chunks, each made of whole frames.
+    """
+    chunks = [bytearray() for _ in range(len(cut_times) + 1)]
+    part = 0
+    for start, end, t in iter_frames(data):
+        while part < len(cut_times) and t >= cut_times[part]:
+            part += 1
+        chunks[part] += data[start:end]
+    return [bytes(c) for c in chunks]
+
+
+def join(chunks, gap=b""):
+    """
+    Concatenates mp3 byte streams frame by frame (ID3 tags and junk dropped),
+    inserting the gap stream (e.g. encoded silence) between consecutive chunks.
+    """
+    out = bytearray()
+    for k, data in enumerate(chunks):
+        if k > 0 and gap:
+            for start, end, _ in iter_frames(gap):
+                out += gap[start:end]
+        for start, end, _ in iter_frames(data):
+            out += data[start:end]
+    return bytes(out)
@@ -0,0 +1,58 @@
+"""
+Sentence sharding for long narration.
+
+Long segments (lesson, blessing, scenes that ignore the 5-8 second guideline)
+are split at sentence ends, synthesized concurrently and stitched back with a
+short pause, so TTS latency follows the longest sentence instead of the
+whole text.
+"""
+import re
+import wave
+
+# Sentence enders: Latin . ! ? (also used in Telugu), Devanagari danda । and double danda ॥.
+# Closing quotes/brackets stay with their sentence.
+# An ender only counts before whitespace / end of text, so "3.5" or "e.g.," stay intact.
+_SENTENCE = re.compile(r"\S.*?(?:[.!?।॥]+[\"'”’)\]]*(?=\s|$)|$)", re.DOTALL)
+
+
+def split_sentences(text, min_chars=40):
+    """
+    Splits text into sentences, merging fragments shorter than min_chars into
+    the previous shard so very short utterances do not lose their prosody.
+    """
+    shards = []
+    for sentence in _SENTENCE.findall(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if shards and len(sentence) < min_chars:
+            shards[-1] = f"{shards[-1]} {sentence}"
+        else:
+            shards.append(sentence)
+    # A short opening fragment goes forward instead
+    if len(shards) > 1 and len(shards[0]) < min_chars:
+        shards[1] = f"{shards[0]} {shards[1]}"
+        shards.pop(0)
+    return shards
+
+
+def join_wav(part_paths, output_path, gap_seconds=0.25):
+    """Concatenates PCM WAV files with gap_seconds of silence between them."""
+    params = None
+    with wave.open(output_path, "wb") as out:
+        for k, path in enumerate(part_paths):
+            with wave.open(path, "rb") as part:
+                if params is None:
+                    params = part.getparams()
+                    out.setnchannels(params.nchannels)
+                    out.setsampwidth(params.sampwidth)
+                    out.setframerate(params.framerate)
+                elif (part.getnchannels(), part.getsampwidth(), part.getframerate()) != \
+                        (params.nchannels, params.sampwidth, params.framerate):
+                    raise ValueError(f"WAV format mismatch in {path}")
+
+                if k > 0 and gap_seconds > 0:
+                    gap_frames = int(params.framerate * gap_seconds)
+                    out.writeframes(b"\x00" * gap_frames * params.nchannels * params.sampwidth)
+                out.writeframes(part.readframes(part.getnframes()))
+    return output_path
@@ -1,8 +1,9 @@
-import requests
 from dotenv import load_dotenv
 import os
 import random
 
+from src.utils.rest_api import RestAPI
+
 load_dotenv()
 
 SILICON_FLOW_API_KEY = os.getenv("SILICON_FLOW_API_KEY")
@@ -30,12 +31,12 @@ def generate_image_flux(prompt, save_path, seed):
 
     print(f"   🎨 Generating Image...", end="", flush=True)
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = RestAPI.session().post(url, json=payload, headers=headers)
         if response.status_code == 200:
             image_url = response.json()['data'][0]['url']
             
             # Download immediately
-            img_data = requests.get(image_url).content
+            img_data = RestAPI.session().get(image_url).content
             with open(save_path, 'wb') as handler:
                 handler.write(img_data)
             print(" Done!")
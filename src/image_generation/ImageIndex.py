@@ -0,0 +1,369 @@
+import os
+import re
+import json
+import shutil
+import threading
+import zlib
+import numpy as np
+from PIL import Image
+
+# ==========================================
+# 🔁 NEAR-DUPLICATE IMAGE REUSE INDEX
+# ==========================================
+# Lesson/blessing shots ("Symbolic peaceful image", "Calm hopeful image") and
+# recurring settings are requested again for every topic with slightly
+# different wording, so exact-match caching never hits. This index keeps a
+# cheap hashed n-gram vector per generated scene and a perceptual hash per
+# image, shared across all topics.
+#
+# Only the VARIABLE part of a prompt is indexed: the scene text (visual_action)
+# is vectorised, and the subject (character anchor) is a separate gate. The
+# shared style suffix is left out on purpose: it is ~80% of the full prompt
+# and pushed unrelated scenes ("Storm at sea" vs "Empty tomb at dawn") above 0.9.
+#
+# Calibration (scene texts, 1024 dims, stopwords dropped):
+#   reworded same shot ("Calm hopeful image" / "A calm, hopeful image")  0.75 – 1.00
+#   same character, different moment (Job in ashes / Job's friends)     0.19 – 0.63
+#   unrelated scenes (Goliath falls / Calm hopeful image, ...)          0.00 – 0.06
+#
+# Query cost: a full 1024-dim scan is ~200 MB at 50k entries. Instead every
+# entry also gets a 256-bit SimHash (sign of a fixed random projection, 32
+# bytes); a query XOR/popcounts those (1.6 MB at 50k) and keeps entries whose
+# Hamming distance could still mean cosine ≥ threshold (expected angle + 4σ of
+# the estimate), then scores only those exactly. Measured with
+# `python -m src.image_generation.ImageIndex` (numpy 2.x, one core, synthetic
+# scene texts, no prefilter misses against a full exact scan):
+#   20k entries: 0.31 ms / query (full scan 5.3 ms), index load 0.1 s
+#   50k entries: 0.77 ms / query (full scan 20 ms),  index load 0.3 s
+INDEX_DIR = os.path.join("Output", "_image_index")
+VECTOR_DIM = 1024           # Exact vectors (float32, 4 KB per entry), only read for prefilter survivors
+SIGNATURE_BITS = 256        # SimHash prefilter scanned on every query
+DEFAULT_THRESHOLD = 0.80
+SUBJECT_THRESHOLD = 0.90    # Subjects (anchors) must match this closely to reuse an image
+PHASH_DUPLICATE_BITS = 4    # Hamming distance at which two images count as the same picture
+INDEX_VERSION = 3           # v2 entries all carried the same placeholder subject; v1/v2 files are ignored
+
+# Legacy RandomState: its stream is frozen, so saved signatures stay valid across numpy versions
+_PROJECTION = np.random.RandomState(0).standard_normal((VECTOR_DIM, SIGNATURE_BITS)).astype(np.float32)
+
+# Function words carry no scene content but add shared n-grams to every text
+STOPWORDS = frozenset(
+    "a an the of in on at to and with his her their its is are was were by from into "
+    "as for over under near he she they it this that".split()
+)
+
+
+def text_vector(prompt):
+    """
+    Hashed bag of word unigrams/bigrams + character trigrams (stopwords
+    dropped), L2-normalised. Stable across runs (crc32), no model download.
+    """
+    text = prompt.lower()
+    words = [w for w in re.findall(r"\w+", text) if w not in STOPWORDS]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    compact = " ".join(words)
+    features += [compact[i:i + 3] for i in range(len(compact) - 2)]
+
+    vec = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        # Sign bit from the hash keeps unrelated collisions from adding up
+        vec[h % VECTOR_DIM] += 1.0 if (h >> 31) & 1 else -1.0
+
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def perceptual_hash(img_path):
+    """64-bit difference hash (dHash) of an image file."""
+    with Image.open(img_path) as img:
+        pixels = np.asarray(img.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def signature(vectors):
+    """SimHash of one vector (or a matrix of them) as SIGNATURE_BITS/64 uint64 words."""
+    bits = np.asarray(vectors, dtype=np.float32) @ _PROJECTION > 0
+    return np.packbits(bits, axis=-1).view(np.uint64)
+
+
+if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+    def _popcount(words, out):
+        return np.bitwise_count(words, out=out)
+else:
+    _POPCOUNT16 = np.array([bin(i).count("1") for i in range(1 << 16)], dtype=np.uint8)
+
+    def _popcount(words, out):
+        return _POPCOUNT16[words.view(np.uint16)].reshape(len(words), 4).sum(axis=1, dtype=np.uint8, out=out)
+
+
+def max_hamming(threshold):
+    """Largest SimHash distance at which the true cosine can still reach threshold."""
+    p = np.arccos(np.clip(threshold, -1.0, 1.0)) / np.pi  # Chance that one bit differs
+    return int(np.ceil(SIGNATURE_BITS * p + 4 * np.sqrt(SIGNATURE_BITS * p * (1 - p))))
+
+
+class ImageIndex:
+    """
+    Local scene text → image index.
+    - query(): SimHash prefilter over all entries, exact cosine for the
+      survivors, then the subject check for those above the threshold.
+    - add(): stores a copy of the image so it survives topic folder clean-ups.
+    Distinct subjects are vectorised once and persisted next to the entries.
+    """
+
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        self.images_dir = os.path.join(index_dir, "images")
+        self.entries_path = os.path.join(index_dir, f"entries_v{INDEX_VERSION}.json")
+        self.vectors_path = os.path.join(index_dir, f"vectors_v{INDEX_VERSION}.npy")
+        self.signatures_path = os.path.join(index_dir, f"signatures_v{INDEX_VERSION}.npy")
+        self.subjects_path = os.path.join(index_dir, f"subjects_v{INDEX_VERSION}.npy")
+
+        self.entries = []
+        self._vectors = np.zeros((1024, VECTOR_DIM), dtype=np.float32)
+        # One contiguous row per signature word: the XOR/popcount passes stream through memory
+        self._signatures = np.zeros((SIGNATURE_BITS // 64, 1024), dtype=np.uint64)
+        self._xor_buffer = np.zeros(1024, dtype=np.uint64)
+        self._count_buffers = np.zeros((2, 1024), dtype=np.uint8)
+        self._entry_subjects = np.zeros(1024, dtype=np.int32)  # Row in _subject_vectors
+        self.subjects = []
+        self._subject_ids = {}
+        self._subject_vectors = np.zeros((0, VECTOR_DIM), dtype=np.float32)
+        self._phashes = {}
+        self._lock = threading.Lock()  # Streaming pipeline queries/adds from worker threads
+        self._load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _load(self):
+        paths = (self.entries_path, self.vectors_path, self.signatures_path, self.subjects_path)
+        if not all(os.path.exists(path) for path in paths):
+            return
+        try:
+            with open(self.entries_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            vectors = np.load(self.vectors_path)
+            signatures = np.load(self.signatures_path)
+            subject_vectors = np.load(self.subjects_path)
+        except Exception as e:
+            print(f"⚠️ Image index unreadable, starting fresh: {e}")
+            return
+
+        subjects = data["subjects"][:len(subject_vectors)]
+        self.subjects = list(subjects)
+        self._subject_ids = {subject: i for i, subject in enumerate(subjects)}
+        self._subject_vectors = subject_vectors[:len(subjects)].astype(np.float32)
+
+        entries = data["entries"]
+        count = min(len(entries), len(vectors), len(signatures))
+        self._reserve(count)
+        self._vectors[:count] = vectors[:count]
+        self._signatures[:, :count] = signatures[:count].T
+        for i, entry in enumerate(entries[:count]):
+            self._entry_subjects[i] = self._subject_id(entry.get("subject", ""))
+        self.entries = entries[:count]
+        self._phashes = {e["phash"]: e["path"] for e in self.entries}
+
+    def _reserve(self, count):
+        if count <= len(self._vectors):
+            return
+        capacity = max(count, len(self._vectors) * 2)
+        used = len(self.entries)
+        for name in ("_vectors", "_entry_subjects"):
+            current = getattr(self, name)
+            grown = np.zeros((capacity,) + current.shape[1:], dtype=current.dtype)
+            grown[:used] = current[:used]
+            setattr(self, name, grown)
+        signatures = np.zeros((len(self._signatures), capacity), dtype=np.uint64)
+        signatures[:, :used] = self._signatures[:, :used]
+        self._signatures = signatures
+        self._xor_buffer = np.zeros(capacity, dtype=np.uint64)
+        self._count_buffers = np.zeros((2, capacity), dtype=np.uint8)
+
+    def _hamming(self, count, sig):
+        """SimHash distance of the first `count` entries to sig (a view of a reused buffer)."""
+        xor = self._xor_buffer[:count]
+        total, word_count = self._count_buffers[0, :count], self._count_buffers[1, :count]
+        for w, word in enumerate(sig):
+            np.bitwise_xor(self._signatures[w, :count], word, out=xor)
+            _popcount(xor, out=total if w == 0 else word_count)
+            if w:
+                np.add(total, word_count, out=total)
+        return total
+
+    def _subject_id(self, subject):
+        """Row of subject in _subject_vectors, vectorising it only the first time it is seen."""
+        if subject not in self._subject_ids:
+            self._subject_ids[subject] = len(self.subjects)
+            self.subjects.append(subject)
+            self._subject_vectors = np.vstack([self._subject_vectors, text_vector(subject)[None]])
+        return self._subject_ids[subject]
+
+    def query(self, text, subject="", threshold=DEFAULT_THRESHOLD):
+        """
+        Returns (image_path, score) of the most similar scene text among entries
+        with the same subject, if the score reaches threshold; else None.
+        """
+        match = self._best(text, subject, threshold)
+        if match is None or not os.path.exists(match[0]):
+            return None
+        return match
+
+    def _best(self, text, subject, threshold):
+        vector = text_vector(text)
+        sig = signature(vector)
+        subject_vector = text_vector(subject)
+        with self._lock:
+            count = len(self.entries)
+            if not count:
+                return None
+            candidates = np.flatnonzero(self._hamming(count, sig) <= max_hamming(threshold))
+            if not candidates.size:
+                return None
+            scores = self._vectors[candidates] @ vector
+            passed = scores >= threshold
+            candidates, scores = candidates[passed], scores[passed]
+            if not candidates.size:
+                return None
+            # Subject check only for the (few) entries that passed on scene text
+            candidate_subjects = self._subject_vectors[self._entry_subjects[candidates]]
+            if subject_vector.any():
+                same_subject = candidate_subjects @ subject_vector >= SUBJECT_THRESHOLD
+            else:
+                same_subject = ~candidate_subjects.any(axis=1)  # Only subject-less entries
+            if not same_subject.any():
+                return None
+            best = int(np.argmax(np.where(same_subject, scores, -1.0)))
+            return self.entries[int(candidates[best])]["path"], float(scores[best])
+
+    def add(self, text, img_path, subject=""):
+        """Indexes a freshly generated image. Visually identical images are stored once."""
+        try:
+            phash = perceptual_hash(img_path)
+        except Exception as e:
+            print(f"   ⚠️ Could not index image: {e}")
+            return
+
+        vector = text_vector(text)
+        with self._lock:
+            stored_path = self._find_duplicate(phash)
+            if stored_path is None:
+                os.makedirs(self.images_dir, exist_ok=True)
+                stored_path = os.path.join(self.images_dir, f"{phash:016x}.png")
+                shutil.copyfile(img_path, stored_path)
+                self._phashes[phash] = stored_path
+            self._append(text, vector, subject, stored_path, phash)
+
+    def _append(self, text, vector, subject, path, phash):
+        i = len(self.entries)
+        self._reserve(i + 1)
+        self._vectors[i] = vector
+        self._signatures[:, i] = signature(vector)
+        self._entry_subjects[i] = self._subject_id(subject)
+        self.entries.append({"text": text, "subject": subject, "path": path, "phash": phash})
+
+    def _find_duplicate(self, phash):
+        if phash in self._phashes:
+            return self._phashes[phash]
+        for known, path in self._phashes.items():
+            if bin(known ^ phash).count("1") <= PHASH_DUPLICATE_BITS:
+                return path
+        return None
+
+    def save(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        with self._lock:
+            count = len(self.entries)
+            np.save(self.vectors_path, self._vectors[:count])
+            np.save(self.signatures_path, self._signatures[:, :count].T)
+            np.save(self.subjects_path, self._subject_vectors)
+            with open(self.entries_path, "w", encoding="utf-8") as f:
+                json.dump({"subjects": self.subjects, "entries": self.entries}, f, ensure_ascii=False)
+
+
+def self_check():
+    """Same scene text, different stories (casts): must never reuse each other's image."""
+    import tempfile
+    job = "Job: elderly man, grey beard, torn brown robe"
+    daniel = "Daniel: young Hebrew man, short dark beard, blue robe"
+    scene = "A man kneels in prayer at night, moonlight on his face"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        img_path = os.path.join(tmp, "scene.png")
+        Image.new("RGB", (64, 36), (90, 60, 30)).save(img_path)
+        index = ImageIndex(os.path.join(tmp, "index"))
+        index.add(scene, img_path, job)
+
+        assert index.query("A man kneels, praying at night, moonlight on his face", job), "same story reworded"
+        assert index.query(scene, daniel) is None, "other story, same scene text"
+        assert index.query(scene, "") is None, "subject-less query"
+    print("✅ Subject gate: reworded scenes reused within a story, never across stories.")
+
+
+
+def benchmark(sizes=(20_000, 50_000), queries=300):
+    """Query/load timings on synthetic scene texts, and prefilter recall vs a full exact scan."""
+    import random
+    import tempfile
+    import time
+    rng = random.Random(0)
+    words = ("shepherd king prophet kneels prays walks desert river storm sea boat tomb dawn night fire "
+             "angel crowd temple gate wall lion den stone sling giant tent well camel palm mountain "
+             "cloud rain rainbow ark dove bread fish net cross garden tree light shadow tears smile").split()
+
+    def scene():
+        return " ".join(rng.choice(words) for _ in range(rng.randint(5, 12)))
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            index = ImageIndex(os.path.join(tmp, "index"))
+            texts = [scene() for _ in range(size)]
+            for i, text in enumerate(texts):
+                index._append(text, text_vector(text), f"Cast {i % 500}", "", i)
+            index.save()
+
+            start = time.perf_counter()
+            index = ImageIndex(os.path.join(tmp, "index"))
+            load_ms = (time.perf_counter() - start) * 1000
+
+            # Half reworded entries (should hit), half fresh scenes
+            probes = []
+            for _ in range(queries):
+                if rng.random() < 0.5:
+                    i = rng.randrange(size)
+                    probe_words = texts[i].split()
+                    probe_words[rng.randrange(len(probe_words))] = rng.choice(words)
+                    probes.append((" ".join(probe_words), f"Cast {i % 500}"))
+                else:
+                    probes.append((scene(), f"Cast {rng.randrange(500)}"))
+
+            exact = index._vectors[:size]
+            matches = misses = 0
+            for text, subject in probes:
+                scores = exact @ text_vector(text)
+                same = index._entry_subjects[:size] == index._subject_ids[subject]
+                expected = (scores >= DEFAULT_THRESHOLD) & same
+                found = index._best(text, subject, DEFAULT_THRESHOLD)
+                matches += bool(expected.any())
+                misses += bool(expected.any()) and found is None
+
+            start = time.perf_counter()
+            for text, subject in probes:
+                index._best(text, subject, DEFAULT_THRESHOLD)
+            query_ms = (time.perf_counter() - start) * 1000 / len(probes)
+
+            start = time.perf_counter()
+            for text, _ in probes:
+                exact @ text_vector(text)
+            scan_ms = (time.perf_counter() - start) * 1000 / len(probes)
+
+        print(f"📏 {size:>6} entries: query {query_ms:.3f} ms (full scan {scan_ms:.2f} ms), "
+              f"load {load_ms:.0f} ms, prefilter misses {misses}/{matches}")
+
+
+if __name__ == "__main__":
+    self_check()
+    benchmark()
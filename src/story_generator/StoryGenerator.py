@@ -4,8 +4,8 @@ import random
 import requests
 from moviepy.editor import *
 from dotenv import load_dotenv
-import re
-from src.utils.rest_api import RestAPI
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.model_router import ModelRouter
 
 load_dotenv()
 
@@ -19,30 +19,22 @@ LANGUAGE_PROFILE_CACHE = {}
 
 
 # ==========================================
-# 2. STORY GENERATOR (GROQ / LLAMA-3)
+# 🧱 STATIC PROMPT PREFIXES
 # ==========================================
-def generate_story_script(topic, AUDIO_LANGUAGE):
-    """
-    audio_languages: list[str]  -> ["english", "telugu", "hindi"]
-    """
-    languages_text = ", ".join(AUDIO_LANGUAGE)
-    print(f"🧠 Generating {AUDIO_LANGUAGE} Masterpiece Script using DeepSeek-V3 for: {topic}...")
-    
-    # ⚠️ Check endpoint: SiliconFlow sometimes uses .cn or .com. 
-    # If .com fails, try "https://api.siliconflow.com/v1/chat/completions"
-    url = "https://api.siliconflow.com/v1/chat/completions"
-    
-    # 🎬 The "DeepSeek" Prompt (English Version)
-    system_prompt = f"""
+# System prompts contain NO per-request values (topic, languages, ...), so every
+# call shares an identical prefix and benefits from provider-side prompt/KV
+# prefix caching. Per-request variables always go in the LAST (user) message.
+STORY_SYSTEM_PROMPT = """
         You are a Biblical Storyboard Generator for animated Bible stories.
 
         Your task is to generate a visually consistent, emotionally rich,
-        and Biblically accurate script for the story: "{topic}".
+        and Biblically accurate script for the story named in the user message.
         
         ====================
         LANGUAGE REQUIREMENT
         ====================
-        - Generate narration in the following languages: {languages_text}
+        - Generate narration in the languages listed in the user message
+          (use exactly those language codes as the narration keys).
         - Each scene MUST include narration for ALL requested languages.
         - Maintain identical meaning and emotional tone across languages.
         - Language should be simple and suitable for children.
@@ -101,110 +93,532 @@ def generate_story_script(topic, AUDIO_LANGUAGE):
         ====================
         OUTPUT FORMAT (JSON ONLY)
         ====================
-        {{
-        "character_anchors": {{
+        {
+        "character_anchors": {
             "CharacterName": "Concise visual identity"
-        }},
+        },
         "scenes": [
-            {{
-            "narration": {{
+            {
+            "narration": {
                 "en": "...",
                 "te": "..."
-            }},
+            },
             "visual_action": "Cinematic visual description"
-            }}
+            }
         ],
-        "lesson": {{
-            "narration": {{
+        "lesson": {
+            "narration": {
             "en": "...",
             "te": "..."
-            }},
+            },
             "visual_action": "Symbolic peaceful image"
-        }},
-        "blessing": {{
-            "narration": {{
+        },
+        "blessing": {
+            "narration": {
             "en": "...",
             "te": "..."
-            }},
+            },
             "visual_action": "Calm hopeful image"
-        }}
-        }}
+        }
+        }
         """
 
 
-    payload = {
-        "model": "deepseek-ai/DeepSeek-V3", # 🏆 Best for Logic + Creative Writing
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Write the script for: {topic}"}
+SCRIPT_TAIL_SYSTEM_PROMPT = """
+        You are a Biblical Storyboard Generator for animated Bible stories.
+
+        You will receive the story name, the narration languages and a PARTIAL script.
+        Its last scene may end mid-story. Continue it; do NOT repeat existing scenes.
+
+        RULES:
+        - Continue the story from exactly where the last scene stops, to its Biblical conclusion.
+        - Add "lesson" and "blessing" at the end.
+        - Narration for ALL of the requested languages (same language codes as the partial script).
+        - Same warm grandparent storyteller tone, ~5–8 seconds of narration per scene.
+        - Reuse the given character anchors, never restate physical descriptions.
+        - If the story is already complete, return an empty "scenes" list.
+
+        OUTPUT FORMAT (JSON ONLY):
+        {
+        "scenes": [
+            { "narration": { "en": "...", "te": "..." }, "visual_action": "..." }
         ],
-        "response_format": {"type": "json_object"},
-        "temperature": 1.1, # High creativity for better storytelling
-        "max_tokens": 4096
-    }
+        "lesson": { "narration": { "en": "...", "te": "..." }, "visual_action": "Symbolic peaceful image" },
+        "blessing": { "narration": { "en": "...", "te": "..." }, "visual_action": "Calm hopeful image" }
+        }
+        """
 
-    headers = {
-        "Authorization": f"Bearer {SILICON_FLOW_API_KEY}",
-        "Content-Type": "application/json"
-    }
+
+# ==========================================
+# 2. STORY GENERATOR (GROQ / LLAMA-3)
+# ==========================================
+def generate_story_script(topic, AUDIO_LANGUAGE):
+    """
+    audio_languages: list[str]  -> ["english", "telugu", "hindi"]
+    """
+    languages_text = ", ".join(AUDIO_LANGUAGE)
+    print(f"🧠 Generating {AUDIO_LANGUAGE} Masterpiece Script for: {topic}...")
+    
+    # 🎬 Static system prompt (cacheable prefix), per-request variables go last
+    system_prompt = STORY_SYSTEM_PROMPT
 
     try:
-        # response = requests.post(url, json=payload, headers=headers)
-        response = RestAPI.request(url=url, method="POST", headers=headers, payload=payload, timeout=180)
-        response.raise_for_status() # Check for HTTP errors
+        # 🏆 "story_script" stays on the strongest tier (Logic + Creative Writing)
+        response = ModelRouter.chat(
+            "story_script",
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": (
+                    f"Narration languages: {languages_text}\n"
+                    f"Write the script for: {topic}"
+                )}
+            ],
+            response_format={"type": "json_object"},
+            temperature=1.1, # High creativity for better storytelling
+            max_tokens=4096
+        )
+        if response is None:
+            raise RuntimeError("No script response from any model")
+        content = response["content"]
         
-        # Parse JSON
-        response_data = response.json()
-        content = response_data['choices'][0]['message']['content']
-        
-        # 🛡️ Safety Clean: Remove Markdown code blocks if DeepSeek adds them
-        content = re.sub(r'```json\s*', '', content)
-        content = re.sub(r'```', '', content)
-        
-        return json.loads(content)
+        try:
+            script = json.loads(content)
+        except json.JSONDecodeError as e:
+            # 🩹 Truncated (max_tokens) or slightly malformed: keep every complete object
+            print(f"⚠️ Script JSON broken ({e}, finish_reason={response['finish_reason']}). Salvaging...")
+            script = salvage_story_script(content, AUDIO_LANGUAGE)
+            if not script or not script["scenes"]:
+                raise
+
+        if missing_script_parts(script, AUDIO_LANGUAGE):
+            return complete_story_script(topic, AUDIO_LANGUAGE, script)
+        return script
 
     except Exception as e:
         print(f"❌ Story Generation Error: {e}")
-        if 'response' in locals():
-            print(f"Response: {response.text}")
+        if 'content' in locals():
+            print(f"Response: {content}")
         return None
 
 
-def generate_video_metadata(topic, story_script_data=None, language="english"):
+# ==========================================
+# 🩹 TOLERANT SCRIPT PARSING & TAIL REGENERATION
+# ==========================================
+def repair_truncated_json(content):
     """
-    Generates YouTube Title, Description, Tags, and Category ID
-    in the requested language.
+    Parses JSON that was cut off mid-stream (or has trailing garbage) by closing
+    it at the last point where a complete object/array value ended.
+    Returns the parsed data, or None if nothing usable is left.
     """
-    lang_cfg = get_cached_language_profile(language)
-    
-    url = "https://api.siliconflow.com/v1/chat/completions"
+    start = content.find("{")
+    if start == -1:
+        return None
+    content = content[start:]
+
+    stack = []
+    safe_points = []  # (cut index, open containers at that point)
+    in_string = False
+    escaped = False
+
+    for i, ch in enumerate(content):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            safe_points.append((i + 1, tuple(stack)))
+        elif ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            safe_points.append((i + 1, tuple(stack)))
+            if not stack:
+                break  # Root object complete, ignore anything after it
+
+    # Latest cut first; fall back to earlier ones if a cut still doesn't parse
+    for cut, open_containers in reversed(safe_points[-50:]):
+        candidate = content[:cut].rstrip().rstrip(",")
+        candidate += "".join(reversed(open_containers))
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def _is_complete_segment(segment, languages):
+    if not isinstance(segment, dict) or not isinstance(segment.get("visual_action"), str):
+        return False
+    narration = segment.get("narration")
+    return isinstance(narration, dict) and all(narration.get(lang) for lang in languages)
+
+
+def salvage_story_script(content, languages):
+    """Keeps the complete anchors, scenes, lesson and blessing of a broken script response."""
+    data = repair_truncated_json(content)
+    if not isinstance(data, dict):
+        return None
 
-    # ---------- Context ----------
-    context = f"Story Topic: {topic}"
+    anchors = data.get("character_anchors")
+    script = {
+        "character_anchors": anchors if isinstance(anchors, dict) else {},
+        "scenes": [s for s in data.get("scenes", []) if _is_complete_segment(s, languages)]
+    }
+    for key in ("lesson", "blessing"):
+        if _is_complete_segment(data.get(key), languages):
+            script[key] = data[key]
+
+    print(f"   🩹 Salvaged {len(script['scenes'])} scenes, "
+          f"lesson={'lesson' in script}, blessing={'blessing' in script}")
+    return script
+
+
+def missing_script_parts(script, languages):
+    """Lists what a usable script still lacks ('scenes', 'lesson', 'blessing')."""
+    missing = []
+    if not script.get("scenes"):
+        missing.append("scenes")
+    for key in ("lesson", "blessing"):
+        if not _is_complete_segment(script.get(key), languages):
+            missing.append(key)
+    return missing
+
+
+def _script_segments(script):
+    return [s for s in script.get("scenes", []) + [script.get("lesson"), script.get("blessing")]
+            if isinstance(s, dict)]
+
+
+def missing_script_languages(script, languages):
+    """Requested languages that at least one scene/lesson/blessing has no narration for."""
+    segments = _script_segments(script)
+    return [lang for lang in languages
+            if not all(isinstance(s.get("narration"), dict) and s["narration"].get(lang) for s in segments)]
+
+
+def _translate_narration(text, source, target):
+    def _validate(content):
+        content = content.strip()
+        if not content or content == text.strip():
+            raise ValueError("empty or untranslated output")
+        return content
+
+    response = ModelRouter.chat(
+        "translate",
+        [{"role": "system", "content": "Translate the user's narration between the language codes given. "
+                                       "Keep the warm storyteller tone. Output ONLY the translated text."},
+         {"role": "user", "content": f"From: {source}\nTo: {target}\nText:\n{text}"}],
+        validate=_validate,
+        temperature=0.3,
+        max_tokens=1024
+    )
+    return response["result"] if response else None
+
+
+def translate_script_languages(script, languages):
+    """
+    Adds the missing `languages` to every segment's narration by translating
+    narration the segment already has, so the scenes (and the images/audio
+    cached for them) stay the same. Returns a new script, or None on failure.
+    """
+    script = json.loads(json.dumps(script))  # Deep copy: the caller's script stays untouched on failure
+    jobs = []
+    for segment in _script_segments(script):
+        if not isinstance(segment.get("narration"), dict):
+            segment["narration"] = {}
+        narration = segment["narration"]
+        source = next((lang for lang in ("en", *narration) if narration.get(lang)), None)
+        if source is None:
+            print("❌ Segment without any narration, cannot translate.")
+            return None
+        jobs += [(narration, source, lang) for lang in languages if not narration.get(lang)]
+
+    print(f"🌐 Translating {len(jobs)} narrations into {missing_script_languages(script, languages)}...")
+    with ThreadPoolExecutor(max_workers=OUTLINE_MAX_WORKERS) as pool:
+        texts = list(pool.map(lambda job: _translate_narration(job[0][job[1]], job[1], job[2]), jobs))
+    if None in texts:
+        print(f"❌ {texts.count(None)} narration translations failed.")
+        return None
+    for (narration, _, lang), text in zip(jobs, texts):
+        narration[lang] = text
+    return script
 
-    if story_script_data and "scenes" in story_script_data:
-        preview_lines = []
-        for scene in story_script_data["scenes"][:2]:
-            narration = scene.get("narration", {}).get(language)
-            if narration:
-                preview_lines.append(narration)
 
-        if preview_lines:
-            context += "\nStory Preview: " + " ".join(preview_lines)
+def complete_story_script(topic, AUDIO_LANGUAGE, partial_script):
+    """
+    Generates ONLY the missing tail of a salvaged script (remaining scenes,
+    lesson, blessing) with the salvaged anchors/scenes passed in as context,
+    instead of regenerating the whole story.
+    """
+    languages_text = ", ".join(AUDIO_LANGUAGE)
+    missing = missing_script_parts(partial_script, AUDIO_LANGUAGE)
+    print(f"🧩 Generating missing script tail {missing} for: {topic}...")
+
+    system_prompt = SCRIPT_TAIL_SYSTEM_PROMPT
+
+    response = ModelRouter.chat(
+        "script_tail",
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": (
+                f"Story: {topic}\n"
+                f"Narration languages: {languages_text}\n"
+                f"Partial script:\n{json.dumps(partial_script, ensure_ascii=False)}"
+            )}
+        ],
+        response_format={"type": "json_object"},
+        temperature=1.1,
+        max_tokens=4096
+    )
+    if response is None:
+        print("❌ Script Tail Generation Error: no response")
+        return None
+
+    tail = salvage_story_script(response["content"], AUDIO_LANGUAGE) or {"scenes": []}
+
+    script = dict(partial_script)
+    script["scenes"] = partial_script.get("scenes", []) + tail["scenes"]
+    for key in ("lesson", "blessing"):
+        if key in tail:
+            script[key] = tail[key]
+
+    if missing_script_parts(script, AUDIO_LANGUAGE):
+        print(f"❌ Script still incomplete: {missing_script_parts(script, AUDIO_LANGUAGE)}")
+        return None
+    return script
+
+
+# ==========================================
+# 🗂️ OUTLINE-THEN-EXPAND SCRIPT MODE
+# ==========================================
+# Phase 1: one short call fixes the character anchors and the beat list.
+# Phase 2: batches of beats (and the lesson/blessing) are expanded in parallel.
+# Every phase-2 user message STARTS with the same outline text, so the batches
+# also share a cacheable prefix; only the batch assignment at the end differs.
+OUTLINE_BATCH_SIZE = 4     # Beats (= scenes) expanded per request
+OUTLINE_MAX_WORKERS = 6    # Parallel expansion requests
+OUTLINE_BATCH_RETRIES = 2  # Extra rounds for failed batches before the single-request fallback
+
+OUTLINE_SYSTEM_PROMPT = """
+        You are a Biblical Storyboard Planner for animated Bible stories.
 
-    # ---------- System Prompt ----------
-    system_prompt = f"""
+        Plan the story named in the user message as an ordered list of BEATS.
+        Each beat becomes ONE scene of ~5–8 seconds of narration later.
+
+        RULES:
+        - Biblically accurate: do NOT add events that contradict the Bible.
+        - The FIRST beat gently sets time, place and emotion (no action or conflict yet).
+        - Start a new beat whenever the setting, focus character, emotional tone
+          or an important action changes.
+        - Follow the story to its Biblical conclusion (typically 12–24 beats).
+        - Define every important character ONCE as a concise visual anchor.
+
+        OUTPUT FORMAT (JSON ONLY):
+        {
+        "character_anchors": {
+            "CharacterName": "Concise visual identity"
+        },
+        "beats": [
+            { "summary": "What happens in this moment", "setting": "Where", "mood": "Emotional tone" }
+        ]
+        }
+        """
+
+SCENE_BATCH_SYSTEM_PROMPT = """
+        You are a Biblical Storyboard Generator for animated Bible stories.
+
+        The user message gives the story OUTLINE (character anchors + numbered beats),
+        the narration languages and the beat numbers assigned to you.
+
+        RULES:
+        - Write EXACTLY one scene per assigned beat, in beat order. Nothing else.
+        - Narration for ALL requested languages (use exactly those language codes as keys),
+          identical meaning and tone across languages, simple words for children.
+        - Warm, emotional grandparent storyteller voice, 3–4 natural sentences
+          (~5–8 seconds), gentle dialogue where appropriate.
+        - Continue smoothly from the previous beat and lead into the next one.
+        - The visual must depict the EXACT narrated moment: camera angle, mood, action.
+        - NEVER restate the character anchors' physical descriptions.
+
+        OUTPUT FORMAT (JSON ONLY):
+        {
+        "scenes": [
+            { "narration": { "en": "...", "te": "..." }, "visual_action": "Cinematic visual description" }
+        ]
+        }
+        """
+
+SCRIPT_CLOSING_SYSTEM_PROMPT = """
+        You are a Biblical Storyboard Generator for animated Bible stories.
+
+        The user message gives the story OUTLINE and the narration languages.
+        Write the closing of the video:
+        - "lesson": the moral of the story for children, warm and simple.
+        - "blessing": a short, calm blessing for the viewer.
+        - Narration for ALL requested languages (use exactly those language codes as keys).
+
+        OUTPUT FORMAT (JSON ONLY):
+        {
+        "lesson": { "narration": { "en": "...", "te": "..." }, "visual_action": "Symbolic peaceful image" },
+        "blessing": { "narration": { "en": "...", "te": "..." }, "visual_action": "Calm hopeful image" }
+        }
+        """
+
+
+def _parse_outline(content):
+    data = _parse_json_with_keys(content, ["character_anchors", "beats"])
+    if not isinstance(data["character_anchors"], dict):
+        raise ValueError("character_anchors is not an object")
+    beats = [b for b in data["beats"] if isinstance(b, dict) and b.get("summary")]
+    if not beats:
+        raise ValueError("no usable beats")
+    data["beats"] = beats
+    return data
+
+
+def _outline_context(topic, languages, outline):
+    """Shared head of every expansion request (identical across batches)."""
+    beats = "\n".join(
+        f"{n}. {b['summary']} (setting: {b.get('setting', '-')}; mood: {b.get('mood', '-')})"
+        for n, b in enumerate(outline["beats"], start=1)
+    )
+    return (
+        f"Story: {topic}\n"
+        f"Narration languages: {', '.join(languages)}\n"
+        f"Character anchors: {json.dumps(outline['character_anchors'], ensure_ascii=False)}\n"
+        f"Beats:\n{beats}\n"
+    )
+
+
+def generate_story_outline(topic, languages):
+    print(f"🗂️ Generating story outline for: {topic}...")
+    response = ModelRouter.chat(
+        "story_outline",
+        [
+            {"role": "system", "content": OUTLINE_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Write the outline for: {topic}"}
+        ],
+        validate=_parse_outline,
+        response_format={"type": "json_object"},
+        temperature=0.9,
+        max_tokens=1536
+    )
+    return response["result"] if response else None
+
+
+def _expand_scene_batch(context, languages, first, count):
+    """Scenes for beats first+1 .. first+count (1-based in the prompt)."""
+    def _validate(content):
+        scenes = json.loads(content).get("scenes") or []
+        scenes = [s for s in scenes if _is_complete_segment(s, languages)]
+        if len(scenes) < count:
+            raise ValueError(f"{len(scenes)}/{count} complete scenes")
+        return scenes[:count]
+
+    response = ModelRouter.chat(
+        "scene_batch",
+        [
+            {"role": "system", "content": SCENE_BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": context + f"\nWrite the scenes for beats {first + 1}–{first + count}."}
+        ],
+        validate=_validate,
+        response_format={"type": "json_object"},
+        temperature=1.1,
+        max_tokens=1024 + 400 * count * len(languages)
+    )
+    return response["result"] if response else None
+
+
+def _expand_closing(context, languages):
+    def _validate(content):
+        data = json.loads(content)
+        if not all(_is_complete_segment(data.get(k), languages) for k in ("lesson", "blessing")):
+            raise ValueError("incomplete lesson/blessing")
+        return {"lesson": data["lesson"], "blessing": data["blessing"]}
+
+    response = ModelRouter.chat(
+        "script_closing",
+        [
+            {"role": "system", "content": SCRIPT_CLOSING_SYSTEM_PROMPT},
+            {"role": "user", "content": context + "\nWrite the lesson and blessing."}
+        ],
+        validate=_validate,
+        response_format={"type": "json_object"},
+        temperature=1.0,
+        max_tokens=1024
+    )
+    return response["result"] if response else None
+
+
+def generate_story_script_outlined(topic, AUDIO_LANGUAGE):
+    """
+    Two-phase script generation: outline first, then scene batches and the
+    lesson/blessing in parallel. Returns the same dict as generate_story_script().
+    Failed batches are re-expanded on their own (keeping the outline and the
+    batches that succeeded); it falls back to generate_story_script() only if
+    the outline fails or a batch still fails after OUTLINE_BATCH_RETRIES rounds.
+    """
+    outline = generate_story_outline(topic, AUDIO_LANGUAGE)
+    if not outline:
+        print("⚠️ Outline failed, falling back to single-request script.")
+        return generate_story_script(topic, AUDIO_LANGUAGE)
+
+    beat_count = len(outline["beats"])
+    context = _outline_context(topic, AUDIO_LANGUAGE, outline)
+    batches = [(first, min(OUTLINE_BATCH_SIZE, beat_count - first))
+               for first in range(0, beat_count, OUTLINE_BATCH_SIZE)]
+    print(f"🧠 Expanding {beat_count} beats in {len(batches)} parallel batches + closing...")
+
+    scene_batches = [None] * len(batches)
+    closing = None
+    with ThreadPoolExecutor(max_workers=OUTLINE_MAX_WORKERS) as pool:
+        for attempt in range(1 + OUTLINE_BATCH_RETRIES):
+            pending = [k for k, batch in enumerate(scene_batches) if batch is None]
+            if not pending and closing is not None:
+                break
+            if attempt:
+                print(f"🔁 Retrying {len(pending)} scene batch(es)"
+                      f"{' + closing' if closing is None else ''} (round {attempt}/{OUTLINE_BATCH_RETRIES})...")
+            closing_future = pool.submit(_expand_closing, context, AUDIO_LANGUAGE) if closing is None else None
+            scene_futures = {k: pool.submit(_expand_scene_batch, context, AUDIO_LANGUAGE, *batches[k])
+                             for k in pending}
+            for k, future in scene_futures.items():
+                scene_batches[k] = future.result()
+            if closing_future is not None:
+                closing = closing_future.result()
+
+    if closing is None or any(batch is None for batch in scene_batches):
+        print("⚠️ Scene expansion failed after retries, falling back to single-request script.")
+        return generate_story_script(topic, AUDIO_LANGUAGE)
+
+    return {
+        "character_anchors": outline["character_anchors"],
+        "scenes": [scene for batch in scene_batches for scene in batch],
+        "lesson": closing["lesson"],
+        "blessing": closing["blessing"],
+    }
+
+
+METADATA_SYSTEM_PROMPT = """
         You are a YouTube Growth Strategist & SEO Expert.
 
         TARGET LANGUAGE:
-        - Language: {lang_cfg["language_name"]}
-        - Audience: {lang_cfg["audience"]}
+        - The target language, audience, Bible phrase, call-to-action and tag
+          hints are given in the TARGET section of the user message.
 
         GOAL:
         Generate high-performing YouTube metadata for a Bible story video.
 
         STRICT RULES:
-        1. Title, Description, and Tags MUST be written ONLY in {lang_cfg["language_name"]}.
+        1. Title, Description, and Tags MUST be written ONLY in the target language.
         2. Language must sound natural and native (not translated word-by-word).
         3. Content must be suitable for children and families.
         4. Optimize for emotional curiosity and faith-based discovery.
@@ -213,18 +627,17 @@ def generate_video_metadata(topic, story_script_data=None, language="english"):
         - Under 100 characters
         - Emotional, curious, or faith-driven
         - Must include the story topic
-        - Must include the phrase "{lang_cfg['bible_phrase']}"
+        - Must include the target Bible phrase
 
         DESCRIPTION RULES:
         - 3–4 short sentences
         - Summarize the story emotionally
-        - End with this call-to-action (translated naturally):
-        "{lang_cfg['cta']}"
-        - Include 5–10 relevant hashtags in {lang_cfg["language_name"]}
+        - End with the target call-to-action (translated naturally)
+        - Include 5–10 relevant hashtags in the target language
 
         TAGS RULES:
         - 15–20 high-search keywords
-        - {lang_cfg["tags_hint"]}
+        - Follow the target tag hints
         - May include English keywords ONLY if commonly searched in YouTube India
 
         CATEGORY:
@@ -234,54 +647,190 @@ def generate_video_metadata(topic, story_script_data=None, language="english"):
         - 27 = Education
 
         OUTPUT FORMAT (STRICT JSON ONLY):
-        {{
+        {
         "title": "...",
         "description": "...",
         "tags": ["...", "..."],
         "category_id": "1"
-        }}
+        }
         """
 
-    payload = {
-        "model": "deepseek-ai/DeepSeek-V3",
-        "messages": [
+
+# ==========================================
+# ✅ OUTPUT VALIDATORS (reject → ModelRouter tries the next tier)
+# ==========================================
+def _parse_json_with_keys(content, required_keys):
+    data = json.loads(content)
+    missing = [k for k in required_keys if not data.get(k)]
+    if missing:
+        raise ValueError(f"missing keys {missing}")
+    return data
+
+
+def _parse_metadata(content):
+    data = _parse_json_with_keys(content, ["title", "description", "tags"])
+    if not isinstance(data["tags"], list):
+        raise ValueError("tags is not a list")
+    return data
+
+
+def _parse_language_profile(content):
+    return _parse_json_with_keys(content, ["language_name", "audience", "bible_phrase", "cta", "tags_hint"])
+
+
+def generate_video_metadata(topic, story_script_data=None, language="english"):
+    """
+    Generates YouTube Title, Description, Tags, and Category ID
+    in the requested language.
+    """
+    lang_cfg = get_cached_language_profile(language)
+
+    # ---------- Context ----------
+    context = f"Story Topic: {topic}"
+
+    if story_script_data and "scenes" in story_script_data:
+        preview_lines = []
+        for scene in story_script_data["scenes"][:2]:
+            narration = scene.get("narration", {}).get(language)
+            if narration:
+                preview_lines.append(narration)
+
+        if preview_lines:
+            context += "\nStory Preview: " + " ".join(preview_lines)
+
+    # ---------- Per-request variables (last, after the static prefix) ----------
+    context += (
+        "\n\nTARGET:"
+        f"\n- Language: {lang_cfg['language_name']}"
+        f"\n- Audience: {lang_cfg['audience']}"
+        f"\n- Bible phrase: {lang_cfg['bible_phrase']}"
+        f"\n- Call-to-action: {lang_cfg['cta']}"
+        f"\n- Tag hints: {lang_cfg['tags_hint']}"
+    )
+    system_prompt = METADATA_SYSTEM_PROMPT
+
+    response = ModelRouter.chat(
+        "metadata",
+        [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": context}
         ],
-        "response_format": {"type": "json_object"},
-        "temperature": 0.7,
-        "max_tokens": 1024
-    }
+        validate=_parse_metadata,
+        response_format={"type": "json_object"},
+        temperature=0.7,
+        max_tokens=1024
+    )
+    if response is None:
+        print(f"❌ Metadata Generation Error [{language}]: no valid response")
+        return None
+    return response["result"]
+    
 
-    headers = {
-        "Authorization": f"Bearer {SILICON_FLOW_API_KEY}",
-        "Content-Type": "application/json"
-    }
+ALL_METADATA_SYSTEM_PROMPT = """
+        You are a multilingual YouTube Growth Strategist & SEO Expert
+        for Christian family audiences in India.
 
-    try:
-        # response = requests.post(url, json=payload, headers=headers)
-        response = RestAPI.request(url=url, method="POST", headers=headers, payload=payload, timeout=180)
-        response.raise_for_status()
+        GOAL:
+        Generate high-performing YouTube metadata for ONE Bible story video
+        that is published once per language code listed in the user message.
 
-        content = response.json()["choices"][0]["message"]["content"]
-        content = re.sub(r"```json\s*", "", content)
-        content = re.sub(r"```", "", content)
+        FOR EVERY LANGUAGE CODE:
+        - Work out the language, its native audience, a natural "Bible Story"
+          phrase and a subscribe call-to-action in that language yourself.
+        - Title, Description, and Tags MUST be written ONLY in that language.
+        - Language must sound natural and native (not translated word-by-word).
+        - Content must be suitable for children and families.
+        - Optimize for emotional curiosity and faith-based discovery.
 
-        return json.loads(content)
+        TITLE RULES:
+        - Under 100 characters
+        - Emotional, curious, or faith-driven
+        - Must include the story topic and the language's "Bible Story" phrase
 
-    except Exception as e:
-        print(f"❌ Metadata Generation Error [{language}]: {e}")
-        return None
-    
+        DESCRIPTION RULES:
+        - 3–4 short sentences
+        - Summarize the story emotionally
+        - End with the subscribe call-to-action
+        - Include 5–10 relevant hashtags in that language
 
-def get_language_profile(language_code):
+        TAGS RULES:
+        - 15–20 high-search keywords
+        - May include English keywords ONLY if commonly searched in YouTube India
+
+        CATEGORY:
+        Choose the ONE best category:
+        - 1 = Film & Animation
+        - 22 = People & Blogs
+        - 27 = Education
+
+        OUTPUT FORMAT (STRICT JSON ONLY, one key per language code):
+        {
+        "videos": {
+            "<language code>": {
+            "title": "...",
+            "description": "...",
+            "tags": ["...", "..."],
+            "category_id": "1"
+            }
+        }
+        }
+        """
+
+
+def generate_all_video_metadata(topic, story_script_data, languages):
     """
-    Dynamically generates language-specific YouTube metadata preferences.
-    Cache the result per language.
+    Generates Title, Description, Tags and Category ID for ALL languages in one
+    structured request (no per-language language-profile round trip).
+    Returns {language: metadata}; languages the model missed fall back to
+    generate_video_metadata().
     """
-    url = "https://api.siliconflow.com/v1/chat/completions"
+    print(f"📝 Generating metadata for {languages} in one request...")
 
-    system_prompt = f"""
+    context = f"Story Topic: {topic}"
+    if story_script_data and "scenes" in story_script_data:
+        for language in languages:
+            preview_lines = [
+                scene.get("narration", {}).get(language)
+                for scene in story_script_data["scenes"][:2]
+                if scene.get("narration", {}).get(language)
+            ]
+            if preview_lines:
+                context += f"\nStory Preview [{language}]: " + " ".join(preview_lines)
+    context += f"\n\nLanguage codes: {', '.join(languages)}"
+
+    def _validate(content):
+        videos = json.loads(content).get("videos", {})
+        parsed = {}
+        for language in languages:
+            try:
+                parsed[language] = _parse_metadata(json.dumps(videos[language]))
+            except Exception:
+                continue
+        if not parsed:
+            raise ValueError("no usable language entries")
+        return parsed
+
+    response = ModelRouter.chat(
+        "metadata",
+        [
+            {"role": "system", "content": ALL_METADATA_SYSTEM_PROMPT},
+            {"role": "user", "content": context}
+        ],
+        validate=_validate,
+        response_format={"type": "json_object"},
+        temperature=0.7,
+        max_tokens=1024 * len(languages)
+    )
+    metadata = response["result"] if response else {}
+
+    for language in languages:
+        if language not in metadata:
+            print(f"   ⚠️ Metadata missing for [{language}], generating it separately.")
+            metadata[language] = generate_video_metadata(topic, story_script_data, language)
+    return metadata
+
+
+LANGUAGE_PROFILE_SYSTEM_PROMPT = """
         You are a multilingual YouTube SEO expert.
 
         TASK:
@@ -294,54 +843,49 @@ def get_language_profile(language_code):
         - Be concise and practical
 
         OUTPUT STRICT JSON:
-        {{
+        {
         "language_name": "...",
         "audience": "...",
         "bible_phrase": "...",
         "cta": "...",
         "tags_hint": "..."
-        }}
+        }
         """
 
-    payload = {
-        "model": "deepseek-ai/DeepSeek-V3",
-        "messages": [
+
+def get_language_profile(language_code):
+    """
+    Dynamically generates language-specific YouTube metadata preferences.
+    Cache the result per language.
+    """
+
+    system_prompt = LANGUAGE_PROFILE_SYSTEM_PROMPT
+
+    response = ModelRouter.chat(
+        "language_profile",
+        [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": f"Language code: {language_code}"}
         ],
-        "response_format": {"type": "json_object"},
-        "temperature": 0.4,
-        "max_tokens": 512
-    }
-
-    headers = {
-        "Authorization": f"Bearer {SILICON_FLOW_API_KEY}",
-        "Content-Type": "application/json"
+        validate=_parse_language_profile,
+        response_format={"type": "json_object"},
+        temperature=0.4,
+        max_tokens=512
+    )
+    if response is not None:
+        return response["result"]
+
+    print(f"❌ Language profile generation failed [{language_code}]")
+
+    # 🔒 SAFE FALLBACK
+    return {
+        "language_name": language_code.upper(),
+        "audience": f"{language_code} speaking Christian audience",
+        "bible_phrase": "Bible Story",
+        "cta": "Subscribe for more Bible Stories!",
+        "tags_hint": "Bible and Christian keywords"
     }
 
-    try:
-        # response = requests.post(url, json=payload, headers=headers)
-        response = RestAPI.request(url=url, method="POST", headers=headers, payload=payload, timeout=180)
-        response.raise_for_status()
-
-        content = response.json()["choices"][0]["message"]["content"]
-        content = re.sub(r"```json\s*", "", content)
-        content = re.sub(r"```", "", content)
-
-        return json.loads(content)
-
-    except Exception as e:
-        print(f"❌ Language profile generation failed: {e}")
-
-        # 🔒 SAFE FALLBACK
-        return {
-            "language_name": language_code.upper(),
-            "audience": f"{language_code} speaking Christian audience",
-            "bible_phrase": "Bible Story",
-            "cta": "Subscribe for more Bible Stories!",
-            "tags_hint": "Bible and Christian keywords"
-        }
-
 
 def get_cached_language_profile(language_code):
     if language_code not in LANGUAGE_PROFILE_CACHE:
@@ -1,5 +1,13 @@
 import os
+import math
+import json
+import subprocess
+import numpy as np
 from moviepy.editor import *
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from src.utils.render_profiler import RenderProfiler
+from src.utils import frame_store
 
 import PIL.Image
 
@@ -8,36 +16,393 @@ if not hasattr(PIL.Image, 'ANTIALIAS'):
     PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
 
 
-def video_clip_generation(audio_path, img_path):
+# ==========================================
+# 🎛️ ENCODER PROFILES
+# ==========================================
+# Our videos are slow zooms over static images, so x264 can spend far fewer
+# bits with tune=stillimage and a long GOP. Compare profiles with:
+#   python -m src.utils.encode_benchmark Output/<story_folder>
+# "crf"/"tune"/"gop"/"pix_fmt" set to None fall back to the x264 defaults.
+ENCODER_PROFILES = {
+    "default": {          # Original settings (x264 defaults)
+        "preset": "medium", "crf": None, "tune": None,
+        "gop": None, "threads": None, "pix_fmt": None
+    },
+    "stillimage": {
+        "preset": "medium", "crf": 23, "tune": "stillimage",
+        "gop": 240, "threads": os.cpu_count(), "pix_fmt": "yuv420p"
+    },
+    "stillimage_fast": {
+        "preset": "veryfast", "crf": 23, "tune": "stillimage",
+        "gop": 240, "threads": os.cpu_count(), "pix_fmt": "yuv420p"
+    },
+    "stillimage_small": {
+        "preset": "slow", "crf": 26, "tune": "stillimage",
+        "gop": 480, "threads": os.cpu_count(), "pix_fmt": "yuv420p"
+    },
+    "draft": {
+        "preset": "ultrafast", "crf": 30, "tune": "stillimage",
+        "gop": 120, "threads": os.cpu_count(), "pix_fmt": "yuv420p"
+    }
+}
+FINAL_ENCODER_PROFILE = "default"
+
+
+def encoder_args(profile_name):
+    """Translates a named encoder profile into write_videofile() keyword args."""
+    profile = ENCODER_PROFILES[profile_name]
+
+    ffmpeg_params = []
+    if profile["crf"] is not None:
+        ffmpeg_params += ["-crf", str(profile["crf"])]
+    if profile["tune"]:
+        ffmpeg_params += ["-tune", profile["tune"]]
+    if profile["gop"]:
+        ffmpeg_params += ["-g", str(profile["gop"])]
+    if profile["pix_fmt"]:
+        ffmpeg_params += ["-pix_fmt", profile["pix_fmt"]]
+
+    return {
+        "codec": "libx264",
+        "preset": profile["preset"],
+        "threads": profile["threads"],
+        "ffmpeg_params": ffmpeg_params or None
+    }
+
+
+# ==========================================
+# 🎞️ DRAFT (PREVIEW) RENDER PROFILE
+# ==========================================
+# Used for editor review before the full render. Reuses the already
+# generated audio/images, only the encode settings are cheaper.
+DRAFT_PROFILE = {
+    "scale": 0.5,                # Fraction of the source resolution
+    "fps": 12,
+    "encoder": "draft",          # Key into ENCODER_PROFILES
+    "sample_every": 1,           # Keep every Nth segment (1 = all segments)
+    "max_segment_seconds": None  # Trim each kept segment (None = full length)
+}
+
+
+def sample_segments(items, every=1):
+    """Keeps every Nth item (always the first one) for quick draft previews."""
+    every = max(1, int(every or 1))
+    return items[::every]
+
+
+# Render segments from the decoded frame store instead of ImageClip + per-frame PIL resize
+USE_FRAME_STORE = True
+
+
+def video_clip_generation(audio_path, img_path, fps=24, scale=1.0, max_duration=None):
     # --- C. Video Clip Creation ---
         try:
             audio_clip = AudioFileClip(audio_path)
+            if max_duration and audio_clip.duration > max_duration:
+                audio_clip = audio_clip.subclip(0, max_duration)
             duration = audio_clip.duration + 0.5
         except:
             print("   ⚠️ Audio load failed, using silent fallback.")
-            duration = 5
+            duration = 5 if not max_duration else min(5, max_duration)
             audio_clip = None
 
-        image_clip = (ImageClip(img_path)
-                      .set_duration(duration)
-                      .resize(lambda t: 1 + 0.02*t) # Slow Zoom
-                      .set_position(('center', 'center'))
-                      .set_fps(24))
+        if USE_FRAME_STORE:
+            # Decoded once per scale into a mmap'd .npy, one window resample per frame (see frame_store.py)
+            make_frame, _ = frame_store.zoom_frame_function(img_path, scale)
+            image_clip = (VideoClip(make_frame, duration=duration)
+                          .set_position(('center', 'center'))
+                          .set_fps(fps))
+        else:
+            base_clip = ImageClip(img_path)
+            if scale != 1.0:
+                base_clip = base_clip.resize(scale)
+
+            image_clip = (base_clip
+                          .set_duration(duration)
+                          .resize(lambda t: 1 + 0.02*t) # Slow Zoom
+                          .set_position(('center', 'center'))
+                          .set_fps(fps))
         
         if audio_clip:
             image_clip = image_clip.set_audio(audio_clip)
         
         return image_clip
 
-def assemble_video(video_clips, base_dir, language):
+# 🔬 Opt-in per-frame render profiling (see render_profiler.py)
+RENDER_PROFILE = os.getenv("RENDER_PROFILE") == "1"
+
+
+# ==========================================
+# 🔊 NARRATION AUDIO PATH (ONE AAC ENCODE)
+# ==========================================
+# MoviePy would decode every narration file frame-by-frame in Python and
+# re-encode it to AAC. Instead the video is written without audio, and ffmpeg
+# pads/concatenates the lossless (or provider-native) narration files and
+# encodes AAC exactly once. The encoded track is cached next to the video and
+# stream-copied into every later render of the same narration.
+NARRATION_SAMPLE_RATE = 48000
+NARRATION_AUDIO_BITRATE = "192k"
+
+
+def narration_tracks(video_clips):
+    """[(audio_path or None, segment_duration)] for a list of segment clips."""
+    tracks = []
+    for clip in video_clips:
+        audio_path = getattr(clip.audio, "filename", None) if clip.audio is not None else None
+        tracks.append((audio_path, clip.duration))
+    return tracks
+
+
+def _tracks_signature(tracks):
+    signature = []
+    for audio_path, duration in tracks:
+        if audio_path and os.path.exists(audio_path):
+            stat = os.stat(audio_path)
+            signature.append([audio_path, stat.st_size, stat.st_mtime, round(duration, 3)])
+        else:
+            signature.append([None, 0, 0, round(duration, 3)])
+    return signature
+
+
+def encode_narration(tracks, output_path):
+    """
+    Builds the full narration track: every segment padded with silence to its
+    clip duration, concatenated and AAC-encoded in a single ffmpeg pass.
+    Reuses output_path as-is when its inputs did not change.
+    """
+    signature_path = output_path + ".json"
+    signature = _tracks_signature(tracks)
+    if os.path.exists(output_path) and os.path.exists(signature_path):
+        with open(signature_path, "r", encoding="utf-8") as f:
+            if json.load(f) == signature:
+                print("   ♻️ Reusing encoded narration track.")
+                return output_path
+
+    cmd = [get_setting("FFMPEG_BINARY"), "-y", "-hide_banner", "-loglevel", "error"]
+    filters = []
+    labels = []
+    input_index = 0
+    for n, (audio_path, duration) in enumerate(tracks):
+        fmt = f"aformat=sample_rates={NARRATION_SAMPLE_RATE}:channel_layouts=stereo"
+        if audio_path and os.path.exists(audio_path):
+            cmd += ["-i", audio_path]
+            filters.append(f"[{input_index}:a]{fmt},apad=whole_dur={duration:.3f},"
+                           f"atrim=0:{duration:.3f}[a{n}]")
+            input_index += 1
+        else:
+            filters.append(f"anullsrc=r={NARRATION_SAMPLE_RATE}:cl=stereo,{fmt},"
+                           f"atrim=0:{duration:.3f}[a{n}]")
+        labels.append(f"[a{n}]")
+    filters.append(f"{''.join(labels)}concat=n={len(tracks)}:v=0:a=1[narration]")
+
+    cmd += [
+        "-filter_complex", ";".join(filters),
+        "-map", "[narration]",
+        "-c:a", "aac", "-b:a", NARRATION_AUDIO_BITRATE,
+        output_path
+    ]
+    subprocess.run(cmd, check=True)
+
+    with open(signature_path, "w", encoding="utf-8") as f:
+        json.dump(signature, f)
+    return output_path
+
+
+def mux_audio(video_path, audio_path, output_path):
+    """Stream-copies a video-only file and an AAC track into one mp4 (no re-encode)."""
+    cmd = [
+        get_setting("FFMPEG_BINARY"), "-y", "-hide_banner", "-loglevel", "error",
+        "-i", video_path, "-i", audio_path,
+        "-map", "0:v:0", "-map", "1:a:0",
+        "-c", "copy", "-shortest", "-movflags", "+faststart",
+        output_path
+    ]
+    subprocess.run(cmd, check=True)
+    return output_path
+
+
+def assemble_video(video_clips, base_dir, language, draft=False, encoder_profile=None, profile=None):
         # --- 3. Final Assembly ---
-    print("\n📼 Assembling Final Video...")
+    print(f"\n📼 Assembling {'Draft' if draft else 'Final'} Video...")
     if video_clips:
+        profile = RENDER_PROFILE if profile is None else profile
+        profiler = RenderProfiler() if profile else None
+        if profiler:
+            profiler.wrap_clips(video_clips)
+
         final_video = concatenate_videoclips(video_clips, method="compose")
-        output_video_path = os.path.join(base_dir, f"Final_Video_{language}.mp4")
-        
-        # Added audio_codec="aac" for better compatibility
-        final_video.write_videofile(output_video_path, fps=24, codec="libx264", audio_codec="aac")
+        suffix = "_draft" if draft else ""
+
+        output_video_path = os.path.join(base_dir, f"Final_Video_{language}{suffix}.mp4")
+        video_only_path = os.path.join(base_dir, f"Final_Video_{language}{suffix}_video.mp4")
+        narration_path = os.path.join(base_dir, f"narration_{language}{suffix}.m4a")
+
+        fps = DRAFT_PROFILE["fps"] if draft else 24
+        codec_args = encoder_args(encoder_profile or (DRAFT_PROFILE["encoder"] if draft else FINAL_ENCODER_PROFILE))
+
+        if profiler:
+            profiler.write_videofile(final_video, video_only_path, fps, **codec_args)
+            profiler.report(os.path.join(base_dir, f"render_profile_{language}{suffix}.json"))
+        else:
+            final_video.write_videofile(video_only_path, fps=fps, audio=False, **codec_args)
+
+        # Single AAC encode of the narration, then stream-copy mux
+        encode_narration(narration_tracks(video_clips), narration_path)
+        mux_audio(video_only_path, narration_path, output_video_path)
+        os.remove(video_only_path)
         print(f"\n✅ SUCCESS! Video saved at: {output_video_path}")
         
-        return output_video_path
\ No newline at end of file
+        return output_video_path
+
+
+# ==========================================
+# 📐 MULTI-VARIANT OUTPUT (ONE DECODE, MANY ENCODERS)
+# ==========================================
+# One pass over the segment timeline: every Ken Burns frame is generated once
+# and fed to one ffmpeg encoder per variant; the narration is AAC-encoded once
+# and stream-copied into every variant.
+#   size        → output (width, height)
+#   crop        → None (scale full frame) or "vertical" (center 9:16 crop)
+#   max_seconds → cut-down length (Shorts), None = full story
+OUTPUT_VARIANTS = {
+    "1080p": {"size": (1920, 1080), "crop": None, "max_seconds": None},
+    "720p": {"size": (1280, 720), "crop": None, "max_seconds": None},
+    # Native 9:16 crop of the 1080p base frame (source art is 576 px tall, so
+    # 1080x1920 would only be an upscale: more CPU and bytes, no detail)
+    "shorts": {"size": (608, 1080), "crop": "vertical", "max_seconds": 60},
+}
+
+
+def variant_base_scale(img_path, variants):
+    """
+    video_clip_generation() scale at which the shared Ken Burns frame matches the
+    largest landscape variant, so every variant is only downscaled or cropped.
+    """
+    with PIL.Image.open(img_path) as img:  # Header only, no decode
+        src_w, src_h = img.size
+    landscape = [OUTPUT_VARIANTS[n]["size"] for n in variants if OUTPUT_VARIANTS[n]["crop"] is None]
+    if landscape:
+        width, height = max(landscape)
+        return max(width / src_w, height / src_h)
+    # Vertical-only: full source height at the tallest variant's height
+    return max(OUTPUT_VARIANTS[n]["size"][1] for n in variants) / src_h
+
+
+def _variant_frame(frame, variant):
+    """Center-crops (vertical variants) and downscales the shared base frame for one variant."""
+    width, height = variant["size"]
+    if variant["crop"] == "vertical":
+        crop_w = min(frame.shape[1], int(round(frame.shape[0] * width / height)))
+        x0 = (frame.shape[1] - crop_w) // 2
+        frame = frame[:, x0:x0 + crop_w]
+    if (frame.shape[1], frame.shape[0]) == (width, height):
+        return frame
+    return np.asarray(PIL.Image.fromarray(frame).resize((width, height), PIL.Image.BILINEAR))
+
+
+def assemble_variants(video_clips, base_dir, language, variants=("1080p", "720p", "shorts"),
+                      encoder_profile=None, fps=24):
+    """
+    Renders several deliverables from ONE pass over the timeline.
+    Build video_clips with scale=variant_base_scale(...) so the shared frame is
+    at the largest landscape size. Returns {variant_name: output_path}.
+    """
+    print(f"\n📼 Assembling variants {list(variants)} in one pass...")
+    if not video_clips:
+        return {}
+
+    final_video = concatenate_videoclips(video_clips, method="compose")
+    codec_args = encoder_args(encoder_profile or FINAL_ENCODER_PROFILE)
+
+    writers = {}
+    video_only_paths = {}
+    for name in variants:
+        video_only_paths[name] = os.path.join(base_dir, f"Final_Video_{language}_{name}_video.mp4")
+        writers[name] = FFMPEG_VideoWriter(
+            video_only_paths[name], OUTPUT_VARIANTS[name]["size"], fps, **codec_args
+        )
+
+    try:
+        n_frames = int(final_video.duration * fps)
+        for frame_index in range(n_frames):
+            t = frame_index / fps
+            active = [
+                name for name in variants
+                if OUTPUT_VARIANTS[name]["max_seconds"] is None or t < OUTPUT_VARIANTS[name]["max_seconds"]
+            ]
+            if not active:
+                break
+
+            # Shared work: Ken Burns zoom + compositing, once per frame
+            frame = final_video.get_frame(t).astype("uint8")
+            for name in active:
+                writers[name].write_frame(_variant_frame(frame, OUTPUT_VARIANTS[name]))
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    # Shared audio: one AAC encode, stream-copied into each variant
+    narration_path = encode_narration(
+        narration_tracks(video_clips), os.path.join(base_dir, f"narration_{language}.m4a")
+    )
+
+    outputs = {}
+    for name in variants:
+        outputs[name] = os.path.join(base_dir, f"Final_Video_{language}_{name}.mp4")
+        mux_audio(video_only_paths[name], narration_path, outputs[name])
+        os.remove(video_only_paths[name])
+        print(f"✅ [{name}] saved at: {outputs[name]}")
+    return outputs
+
+
+# ==========================================
+# 🌊 PER-SEGMENT RENDER (STREAMING PIPELINE)
+# ==========================================
+# Segments are encoded as soon as their assets exist, then joined with the
+# ffmpeg concat demuxer (stream copy, no re-encode) in segment order.
+def render_segment(audio_path, img_path, output_path, fps=24, encoder_profile=None):
+    """
+    Encodes ONE segment (video only) and returns its duration in seconds.
+    The duration is rounded up to whole frames, so concatenated segments and
+    the padded narration track never drift apart.
+    """
+    clip = video_clip_generation(audio_path, img_path, fps=fps)
+    n_frames = int(math.ceil(clip.duration * fps))
+    duration = n_frames / fps
+
+    # Fixed canvas: the zoomed clip grows every frame, the output must not
+    canvas = CompositeVideoClip([clip], size=clip.size).set_duration(duration)
+
+    writer = FFMPEG_VideoWriter(
+        output_path, canvas.size, fps, **encoder_args(encoder_profile or FINAL_ENCODER_PROFILE)
+    )
+    try:
+        for frame_index in range(n_frames):
+            writer.write_frame(canvas.get_frame(frame_index / fps).astype("uint8"))
+    finally:
+        writer.close()
+    return duration
+
+
+def concat_segments(segment_paths, tracks, output_path):
+    """
+    Joins per-segment videos (in the given order) with the concat demuxer and
+    muxes the single-encode narration built from tracks [(audio_path, duration)].
+    """
+    list_path = output_path + ".segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+
+    video_only_path = output_path.replace(".mp4", "_video.mp4")
+    subprocess.run([
+        get_setting("FFMPEG_BINARY"), "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", video_only_path
+    ], check=True)
+    os.remove(list_path)
+
+    narration_path = encode_narration(tracks, output_path.replace(".mp4", ".m4a"))
+    mux_audio(video_only_path, narration_path, output_path)
+    os.remove(video_only_path)
+    print(f"\n✅ SUCCESS! Video saved at: {output_path}")
+    return output_path
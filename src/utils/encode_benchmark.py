@@ -0,0 +1,197 @@
+"""
+Encoder profile benchmark.
+
+Renders the reference story ONCE to a lossless file, then re-encodes that
+file with ffmpeg for every profile in Utils.ENCODER_PROFILES and reports
+encode time, output size and quality (SSIM / PSNR) against the reference.
+MoviePy frame generation (zoom, compositing) is identical for every profile,
+so it is kept out of the timings; the time ffmpeg needs to decode the
+reference is measured once and subtracted.
+
+With --frame-store it instead renders the Ken Burns timeline losslessly through
+MoviePy (ImageClip + per-frame resize) and through the frame store
+(Utils.USE_FRAME_STORE) and reports the store's SSIM / PSNR against MoviePy.
+
+Usage (from the repo root):
+    python -m src.utils.encode_benchmark Output/story_of_job_from_the_bible
+    python -m src.utils.encode_benchmark Output/<story> --language te --seconds 30 \
+        --profiles default stillimage stillimage_fast
+    python -m src.utils.encode_benchmark Output/<story> --frame-store --seconds 30
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import time
+
+from moviepy.config import get_setting
+from moviepy.editor import concatenate_videoclips
+
+from src.utils import Utils
+from src.audion_generation.AudioGenerator import AudioGenerator
+
+
+def load_reference_story(story_dir, language, max_seconds=None):
+    """Builds the Ken Burns timeline of an already generated story folder."""
+    img_dir = os.path.join(story_dir, "images")
+    aud_dir = os.path.join(story_dir, "audio", language)
+
+    clips = []
+    i = 0
+    while os.path.exists(os.path.join(img_dir, f"image_{i}.png")):
+        audio_path = os.path.join(aud_dir, AudioGenerator.audio_filename(i, language))
+        img_path = os.path.join(img_dir, f"image_{i}.png")
+        clips.append(Utils.video_clip_generation(audio_path, img_path))
+        i += 1
+
+    if not clips:
+        raise FileNotFoundError(f"No images found in {img_dir}")
+
+    timeline = concatenate_videoclips(clips, method="compose")
+    if max_seconds and timeline.duration > max_seconds:
+        timeline = timeline.subclip(0, max_seconds)
+    return timeline
+
+
+def measure_quality(encoded_path, reference_path):
+    """Returns (ssim, psnr) of encoded_path vs reference_path using ffmpeg filters."""
+    cmd = [
+        get_setting("FFMPEG_BINARY"), "-hide_banner", "-nostats",
+        "-i", encoded_path, "-i", reference_path,
+        "-lavfi", "[0:v]split[a][b];[1:v]split[r1][r2];[a][r1]ssim;[b][r2]psnr",
+        "-f", "null", "-"
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+
+    ssim = re.search(r"SSIM .*All:([\d.]+)", result.stderr)
+    psnr = re.search(r"PSNR .*average:([\d.]+|inf)", result.stderr)
+    return (
+        float(ssim.group(1)) if ssim else None,
+        float(psnr.group(1)) if psnr else None
+    )
+
+
+def ffmpeg_encode_cmd(profile_name, input_path, output_path):
+    """ffmpeg command that encodes input_path with the same settings Utils.encoder_args() gives MoviePy."""
+    args = Utils.encoder_args(profile_name)
+    cmd = [get_setting("FFMPEG_BINARY"), "-y", "-hide_banner", "-loglevel", "error",
+           "-i", input_path, "-an", "-c:v", args["codec"], "-preset", args["preset"]]
+    if args["threads"]:
+        cmd += ["-threads", str(args["threads"])]
+    params = args["ffmpeg_params"] or []
+    if "-pix_fmt" not in params:
+        params = params + ["-pix_fmt", "yuv420p"]  # What MoviePy adds for libx264
+    return cmd + params + [output_path]
+
+
+def time_command(cmd):
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True)
+    return time.perf_counter() - start
+
+
+def write_lossless(timeline, path):
+    timeline.write_videofile(
+        path, fps=24, codec="libx264", audio=False, preset="ultrafast",
+        ffmpeg_params=["-qp", "0"], logger=None
+    )
+
+
+def frame_store_check(story_dir, language="en", max_seconds=None):
+    """Frame store vs MoviePy Ken Burns render: wall time of each, SSIM / PSNR of the store."""
+    bench_dir = os.path.join(story_dir, "encode_benchmark")
+    os.makedirs(bench_dir, exist_ok=True)
+
+    use_frame_store = Utils.USE_FRAME_STORE
+    paths, seconds = {}, {}
+    try:
+        for name, enabled in (("moviepy", False), ("frame_store", True)):
+            Utils.USE_FRAME_STORE = enabled
+            paths[name] = os.path.join(bench_dir, f"zoom_{name}.mp4")
+            print(f"⏱️ Rendering [{name}] losslessly...", end="", flush=True)
+            start = time.perf_counter()
+            write_lossless(load_reference_story(story_dir, language, max_seconds), paths[name])
+            seconds[name] = round(time.perf_counter() - start, 2)
+            print(f" {seconds[name]}s")
+    finally:
+        Utils.USE_FRAME_STORE = use_frame_store
+
+    ssim, psnr = measure_quality(paths["frame_store"], paths["moviepy"])
+    report_path = os.path.join(bench_dir, "frame_store.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"story": story_dir, "language": language, "render_seconds": seconds,
+                   "ssim": ssim, "psnr": psnr}, f, indent=4)
+    print(f"\n📏 Frame store vs MoviePy: SSIM {ssim}, PSNR {psnr} dB "
+          f"({seconds['frame_store']}s vs {seconds['moviepy']}s)")
+    print(f"✅ Report saved at: {report_path}")
+    return ssim, psnr
+
+
+def run_benchmark(story_dir, language="en", profiles=None, max_seconds=None):
+    profiles = profiles or list(Utils.ENCODER_PROFILES)
+    timeline = load_reference_story(story_dir, language, max_seconds)
+
+    bench_dir = os.path.join(story_dir, "encode_benchmark")
+    os.makedirs(bench_dir, exist_ok=True)
+
+    # Lossless reference (video only, audio is identical across profiles)
+    reference_path = os.path.join(bench_dir, "reference_lossless.mp4")
+    print("📏 Rendering lossless reference...")
+    write_lossless(timeline, reference_path)
+
+    # Decode-only baseline: every profile run below pays this before encoding
+    decode_seconds = time_command([
+        get_setting("FFMPEG_BINARY"), "-hide_banner", "-loglevel", "error",
+        "-i", reference_path, "-an", "-f", "null", "-"
+    ])
+    print(f"📏 Reference decode: {decode_seconds:.2f}s (subtracted from encode times)")
+
+    results = []
+    for name in profiles:
+        output_path = os.path.join(bench_dir, f"{name}.mp4")
+        print(f"⏱️ Encoding profile [{name}]...", end="", flush=True)
+
+        wall_seconds = time_command(ffmpeg_encode_cmd(name, reference_path, output_path))
+        encode_seconds = max(0.0, wall_seconds - decode_seconds)
+
+        ssim, psnr = measure_quality(output_path, reference_path)
+        results.append({
+            "profile": name,
+            "encode_seconds": round(encode_seconds, 2),
+            "wall_seconds": round(wall_seconds, 2),
+            "output_bytes": os.path.getsize(output_path),
+            "ssim": ssim,
+            "psnr": psnr
+        })
+        print(" Done!")
+
+    report_path = os.path.join(bench_dir, "results.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"story": story_dir, "language": language, "duration": timeline.duration,
+                   "decode_seconds": round(decode_seconds, 2), "results": results}, f, indent=4)
+
+    print(f"\n{'profile':<20}{'encode s':>10}{'size MB':>10}{'SSIM':>9}{'PSNR':>8}")
+    for r in results:
+        ssim = f"{r['ssim']:.4f}" if r["ssim"] is not None else "n/a"
+        psnr = f"{r['psnr']:.2f}" if r["psnr"] is not None else "n/a"
+        print(f"{r['profile']:<20}{r['encode_seconds']:>10.2f}"
+              f"{r['output_bytes'] / 1e6:>10.2f}{ssim:>9}{psnr:>8}")
+    print(f"\n✅ Report saved at: {report_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark encoder profiles on a generated story.")
+    parser.add_argument("story_dir", help="Story folder, e.g. Output/story_of_job_from_the_bible")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--profiles", nargs="*", help="Profiles to test (default: all)")
+    parser.add_argument("--seconds", type=float, help="Only benchmark the first N seconds")
+    parser.add_argument("--frame-store", action="store_true",
+                        help="Compare the frame store render against MoviePy instead")
+    args = parser.parse_args()
+
+    if args.frame_store:
+        frame_store_check(args.story_dir, args.language, args.seconds)
+    else:
+        run_benchmark(args.story_dir, args.language, args.profiles, args.seconds)
@@ -0,0 +1,80 @@
+import os
+import numpy as np
+from PIL import Image
+
+# ==========================================
+# 🗄️ DECODED FRAME STORE (mmap'd .npy per image)
+# ==========================================
+# ImageClip(img_path) decodes the PNG again for every render (per language,
+# draft + final, re-renders) and the Ken Burns resize LANCZOS-resamples the
+# WHOLE image, grown by the zoom factor, for every frame. Instead each image
+# is decoded ONCE per output scale into a raw RGB .npy, pre-scaled to
+# MAX_ZOOM × that scale, and every frame is one filtered resample of just the
+# visible window:
+#   - the window has fractional bounds, so the slow zoom moves smoothly
+#     instead of in whole-pixel steps,
+#   - PIL's bilinear resize widens its kernel when shrinking, so the
+#     1.25:1 → 1:1 reduction over a segment doesn't alias or shimmer,
+#   - stores are keyed by scale, so a render never depends on which
+#     (variant/draft) render built the store first.
+# Compare against the MoviePy path with:
+#   python -m src.utils.encode_benchmark Output/<story> --frame-store
+MAX_ZOOM = 1.25  # Zoom covered without upsampling (1 + 0.02*t → 12.5 s segments)
+ZOOM_PER_SECOND = 0.02
+
+
+def store_path(img_path, scale=1.0):
+    return f"{os.path.splitext(img_path)[0]}.frames_{round(scale, 4):g}x.npy"
+
+
+def build(img_path, scale=1.0, max_zoom=MAX_ZOOM):
+    """Decodes img_path into its .npy store for `scale` (atomic, safe with parallel renderers)."""
+    path = store_path(img_path, scale)
+    factor = scale * max_zoom
+    with Image.open(img_path) as img:
+        img = img.convert("RGB")
+        size = (round(img.width * factor), round(img.height * factor))
+        pixels = np.asarray(img.resize(size, Image.LANCZOS), dtype=np.uint8)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, pixels)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load(img_path, scale=1.0):
+    """
+    Returns (frames, (width, height)): the read-only memory-mapped store for
+    `scale` and the image's own size. The store is (re)built when missing or
+    older than the image.
+    """
+    path = store_path(img_path, scale)
+    with Image.open(img_path) as img:  # Header only, no decode
+        size = img.size
+
+    if not (os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(img_path)):
+        build(img_path, scale)
+    return np.load(path, mmap_mode="r"), size
+
+
+def zoom_frame_function(img_path, scale=1.0, zoom_per_second=ZOOM_PER_SECOND):
+    """
+    make_frame(t) for a centered slow zoom, matching
+    ImageClip(img).resize(scale).resize(lambda t: 1 + zoom_per_second*t) on a
+    canvas of the clip's first-frame size. Returns (make_frame, (width, height)).
+    """
+    frames, (width, height) = load(img_path, scale)
+    out_w, out_h = round(width * scale), round(height * scale)
+    src_h, src_w = frames.shape[:2]
+    image = Image.fromarray(np.asarray(frames))  # One copy per clip, frames only read from it
+
+    def make_frame(t):
+        zoom = 1 + zoom_per_second * t
+        # Visible part of the image (in store pixels) shrinks with the zoom factor
+        win_w, win_h = src_w / zoom, src_h / zoom
+        x0, y0 = (src_w - win_w) / 2, (src_h - win_h) / 2
+        box = (x0, y0, x0 + win_w, y0 + win_h)
+        return np.asarray(image.resize((out_w, out_h), Image.BILINEAR, box=box))
+
+    return make_frame, (out_w, out_h)
@@ -0,0 +1,145 @@
+import os
+import re
+import time
+import threading
+from typing import Optional, Dict, Any, Callable, List
+
+from dotenv import load_dotenv
+from src.utils.rest_api import RestAPI
+from src.utils import token_counter
+
+load_dotenv()
+SILICON_FLOW_API_KEY = os.getenv("SILICON_FLOW_API_KEY")
+
+
+class ModelRouter:
+    """
+    Routes each chat task to a model tier (small → large).
+    Short structured tasks start on a fast model and fall back UP a tier when
+    the request fails or the output fails validation; the story script keeps
+    the strongest model. Per-model latency/failure stats are kept in memory.
+    """
+
+    URL = "https://api.siliconflow.com/v1/chat/completions"
+
+    # Override with LLM_MODEL_TIERS="small,medium,large"
+    MODEL_TIERS = os.getenv(
+        "LLM_MODEL_TIERS",
+        "Qwen/Qwen2.5-7B-Instruct,Qwen/Qwen2.5-72B-Instruct,deepseek-ai/DeepSeek-V3"
+    ).split(",")
+
+    # Starting tier per task (index into MODEL_TIERS)
+    TASK_TIERS = {
+        "story_script": 2,
+        "script_tail": 2,
+        "story_outline": 2,
+        "scene_batch": 1,       # Short, outline-constrained: escalates to the top tier on failure
+        "script_closing": 1,
+        "metadata": 1,
+        "language_profile": 0,
+        "translate": 0,
+    }
+
+    STATS: Dict[str, Dict[str, float]] = {}
+    _stats_lock = threading.Lock()
+
+    @staticmethod
+    def _record(model: str, latency: float, outcome: str) -> None:
+        with ModelRouter._stats_lock:
+            stats = ModelRouter.STATS.setdefault(model, {
+                "calls": 0, "ok": 0, "request_failures": 0,
+                "validation_failures": 0, "total_latency": 0.0, "max_latency": 0.0
+            })
+            stats["calls"] += 1
+            stats[outcome] += 1
+            stats["total_latency"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
+
+    @staticmethod
+    def clean_content(content: str) -> str:
+        """Removes Markdown code fences models sometimes wrap JSON in."""
+        content = re.sub(r"```json\s*", "", content)
+        return re.sub(r"```", "", content)
+
+    @staticmethod
+    def chat(
+        task: str,
+        messages: List[Dict[str, str]],
+        validate: Optional[Callable[[str], Any]] = None,
+        timeout: int = 180,
+        **params
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Runs a chat completion for `task`, escalating tiers on failure.
+
+        Args:
+            task (str): Key into TASK_TIERS (unknown tasks use the largest model).
+            messages (list): Chat messages.
+            validate (callable): Parses/validates the cleaned content; raise to reject it.
+            **params: Extra payload fields (temperature, max_tokens, response_format...).
+
+        Returns:
+            dict: {"content", "result", "model", "finish_reason", "usage"} or None.
+        """
+        start_tier = min(ModelRouter.TASK_TIERS.get(task, len(ModelRouter.MODEL_TIERS) - 1),
+                         len(ModelRouter.MODEL_TIERS) - 1)
+        headers = {
+            "Authorization": f"Bearer {SILICON_FLOW_API_KEY}",
+            "Content-Type": "application/json"
+        }
+
+        for model in ModelRouter.MODEL_TIERS[start_tier:]:
+            payload = {"model": model, "messages": messages, **params}
+            start = time.perf_counter()
+            response = RestAPI.request(url=ModelRouter.URL, method="POST", headers=headers,
+                                       payload=payload, timeout=timeout)
+            latency = time.perf_counter() - start
+
+            try:
+                data = response.json()
+                choice = data["choices"][0]
+                content = ModelRouter.clean_content(choice["message"]["content"])
+            except Exception as e:
+                ModelRouter._record(model, latency, "request_failures")
+                print(f"   ⚠️ [{task}] {model} failed ({e}), trying next tier...")
+                continue
+
+            try:
+                result = validate(content) if validate else content
+            except Exception as e:
+                ModelRouter._record(model, latency, "validation_failures")
+                token_counter.record_call(task, model, messages, content, data.get("usage"), latency)
+                print(f"   ⚠️ [{task}] {model} output rejected ({e}), trying next tier...")
+                continue
+
+            ModelRouter._record(model, latency, "ok")
+            token_counter.record_call(task, model, messages, content, data.get("usage"), latency)
+            return {
+                "content": content,
+                "result": result,
+                "model": model,
+                "finish_reason": choice.get("finish_reason"),
+                "usage": data.get("usage"),
+            }
+
+        print(f"   ❌ [{task}] All model tiers failed.")
+        return None
+
+    @staticmethod
+    def reset_stats() -> None:
+        """Clears per-model stats and token totals, e.g. between jobs of a long-lived process."""
+        with ModelRouter._stats_lock:
+            ModelRouter.STATS.clear()
+        token_counter.reset()
+
+    @staticmethod
+    def report() -> None:
+        """Prints per-model call counts, failure counts and latency, plus token totals."""
+        token_counter.report()
+        if not ModelRouter.STATS:
+            return
+        print(f"\n🧭 {'model':<36}{'calls':>6}{'ok':>5}{'req✗':>6}{'val✗':>6}{'avg s':>8}{'max s':>8}")
+        for model, s in ModelRouter.STATS.items():
+            avg = s["total_latency"] / s["calls"] if s["calls"] else 0.0
+            print(f"   {model[:35]:<36}{s['calls']:>6}{s['ok']:>5}{s['request_failures']:>6}"
+                  f"{s['validation_failures']:>6}{avg:>8.2f}{s['max_latency']:>8.2f}")
@@ -0,0 +1,144 @@
+import json
+import time
+import numpy as np
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+# ==========================================
+# 🔬 FRAME-LEVEL RENDER PROFILER (opt-in)
+# ==========================================
+# Enable with RENDER_PROFILE=1 (or assemble_video(..., profile=True)).
+# Every frame of the final timeline is split into:
+#   zoom     → the segment clip's frame function (frame-store window resample, or the
+#              whole-image PIL resize of the Ken Burns lambda with USE_FRAME_STORE=False)
+#   compose  → CompositeVideoClip blitting from concatenate_videoclips(method="compose")
+#   convert  → numpy dtype conversion + tobytes() for the pipe
+#   write    → blocking write into ffmpeg's stdin (encoder backpressure)
+PHASES = ("zoom", "compose", "convert", "write")
+HISTOGRAM_BINS_MS = [0, 5, 10, 20, 40, 80, 160, 1e9]  # last bin = "160 ms and slower"
+
+
+class RenderProfiler:
+
+    def __init__(self):
+        self.segment_bounds = []   # (start, end) seconds per segment
+        self.samples = []          # (segment_index, {phase: seconds})
+        self._zoom_seconds = 0.0
+
+    # ------------------------------------------
+    # Instrumentation
+    # ------------------------------------------
+    def wrap_clips(self, video_clips):
+        """Wraps each segment clip's frame function. Call BEFORE concatenation."""
+        start = 0.0
+        for clip in video_clips:
+            self.segment_bounds.append((start, start + clip.duration))
+            start += clip.duration
+
+            inner = clip.make_frame
+
+            def timed(t, inner=inner):
+                t0 = time.perf_counter()
+                frame = inner(t)
+                self._zoom_seconds += time.perf_counter() - t0
+                return frame
+
+            clip.make_frame = timed
+        return video_clips
+
+    def _segment_at(self, t):
+        for i, (start, end) in enumerate(self.segment_bounds):
+            if start <= t < end:
+                return i
+        return len(self.segment_bounds) - 1
+
+    def write_videofile(self, clip, output_path, fps, codec="libx264", preset="medium",
+                        threads=None, ffmpeg_params=None):
+        """Video-only replacement for clip.write_videofile() that times every phase."""
+        writer = FFMPEG_VideoWriter(
+            output_path, clip.size, fps, codec=codec, preset=preset,
+            threads=threads, ffmpeg_params=ffmpeg_params
+        )
+        total_start = time.perf_counter()
+        try:
+            n_frames = int(clip.duration * fps)
+            for frame_index in range(n_frames):
+                t = frame_index / fps
+                self._zoom_seconds = 0.0
+
+                t0 = time.perf_counter()
+                frame = clip.get_frame(t)
+                t1 = time.perf_counter()
+                data = frame.astype("uint8").tobytes()
+                t2 = time.perf_counter()
+                writer.proc.stdin.write(data)
+                t3 = time.perf_counter()
+
+                self.samples.append((self._segment_at(t), {
+                    "zoom": self._zoom_seconds,
+                    "compose": max(0.0, (t1 - t0) - self._zoom_seconds),
+                    "convert": t2 - t1,
+                    "write": t3 - t2,
+                }))
+        finally:
+            writer.close()
+        self.wall_seconds = time.perf_counter() - total_start
+        return output_path
+
+    # ------------------------------------------
+    # Reporting
+    # ------------------------------------------
+    def summary(self):
+        per_frame_ms = {p: np.array([s[p] for _, s in self.samples]) * 1000 for p in PHASES}
+        totals_ms = sum(per_frame_ms.values()) if self.samples else np.array([])
+
+        overall = {
+            "frames": len(self.samples),
+            "wall_seconds": round(getattr(self, "wall_seconds", 0.0), 2),
+            "ms_per_frame": round(float(totals_ms.mean()), 2) if len(totals_ms) else 0.0,
+            "phases": {
+                p: {
+                    "mean_ms": round(float(v.mean()), 3),
+                    "p95_ms": round(float(np.percentile(v, 95)), 3),
+                    "share": round(float(v.sum() / totals_ms.sum()), 3) if totals_ms.sum() else 0.0,
+                }
+                for p, v in per_frame_ms.items() if len(v)
+            },
+        }
+
+        segments = []
+        for i in range(len(self.segment_bounds)):
+            idx = [n for n, (seg, _) in enumerate(self.samples) if seg == i]
+            if not idx:
+                continue
+            seg_totals = totals_ms[idx]
+            counts, _ = np.histogram(seg_totals, bins=HISTOGRAM_BINS_MS)
+            segments.append({
+                "segment": i,
+                "frames": len(idx),
+                "ms_per_frame": round(float(seg_totals.mean()), 2),
+                "phases_mean_ms": {p: round(float(per_frame_ms[p][idx].mean()), 3) for p in PHASES},
+                "histogram": counts.tolist(),
+            })
+        return {"overall": overall, "segments": segments, "histogram_bins_ms": HISTOGRAM_BINS_MS[:-1]}
+
+    def report(self, output_json=None):
+        summary = self.summary()
+        overall = summary["overall"]
+
+        print(f"\n🔬 Render profile: {overall['frames']} frames, {overall['wall_seconds']}s wall, "
+              f"{overall['ms_per_frame']} ms/frame")
+        for phase, p in overall["phases"].items():
+            print(f"   {phase:<8} mean {p['mean_ms']:>8.2f} ms   p95 {p['p95_ms']:>8.2f} ms   "
+                  f"{p['share'] * 100:>5.1f}%")
+
+        labels = [f"<{int(b)}" for b in HISTOGRAM_BINS_MS[1:-1]] + [f"≥{int(HISTOGRAM_BINS_MS[-2])}"]
+        print(f"\n   {'seg':>4}{'frames':>8}{'ms/f':>8}  " + "".join(f"{l:>6}" for l in labels))
+        for seg in summary["segments"]:
+            print(f"   {seg['segment']:>4}{seg['frames']:>8}{seg['ms_per_frame']:>8.1f}  "
+                  + "".join(f"{c:>6}" for c in seg["histogram"]))
+
+        if output_json:
+            with open(output_json, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=4)
+            print(f"   📄 Profile saved at: {output_json}")
+        return summary
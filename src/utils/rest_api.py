@@ -1,12 +1,33 @@
 import requests
+import threading
 import time
 from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
 
 class RestAPI:
     """
     A robust, generic wrapper for handling REST API calls with automatic retries.
+    All calls share one pooled Session, so keep-alive connections (TLS included)
+    are reused across requests, stages and daemon jobs.
     """
 
+    POOL_SIZE = 16  # Keep-alive connections per host (covers concurrent TTS/image threads)
+    _session = None
+    _session_lock = threading.Lock()
+
+    @staticmethod
+    def session() -> requests.Session:
+        """Returns the shared pooled Session (created on first use)."""
+        if RestAPI._session is None:
+            with RestAPI._session_lock:
+                if RestAPI._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=RestAPI.POOL_SIZE, pool_maxsize=RestAPI.POOL_SIZE)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    RestAPI._session = session
+        return RestAPI._session
+
     @staticmethod
     def request(
         url: str, 
@@ -39,7 +60,7 @@ class RestAPI:
                 if attempt > 1:
                     print(f"   🔄 Retry {attempt}/{max_retries}...")
 
-                response = requests.request(
+                response = RestAPI.session().request(
                     method=method,
                     url=url,
                     json=payload if method in ["POST", "PUT"] else None,
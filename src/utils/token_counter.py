@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import threading
+
+# ==========================================
+# 🔢 TOKEN ACCOUNTING
+# ==========================================
+# Logs prompt/completion tokens and an estimated prefill time for every chat
+# call, so the effect of prefix caching (static system prompts) on
+# time-to-first-token can be measured across runs.
+# Provider "usage" numbers are used when present, otherwise a local estimate.
+PREFILL_TOKENS_PER_SECOND = float(os.getenv("PREFILL_TOKENS_PER_SECOND", "2000"))
+TOKEN_LOG_PATH = os.getenv("TOKEN_LOG_PATH", os.path.join("Output", "token_log.jsonl"))
+
+_TOTALS = {}
+_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    """
+    Cheap local estimate: ~4 chars/token for ASCII (English, JSON) and
+    ~1.5 chars/token for Indic scripts, which BPE vocabularies split finely.
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other_chars = len(text) - ascii_chars
+    return int(ascii_chars / 4 + other_chars / 1.5) + 1
+
+
+def estimate_message_tokens(messages):
+    # ~4 tokens of chat-template overhead per message
+    return sum(estimate_tokens(m.get("content", "")) + 4 for m in messages)
+
+
+def _cached_tokens(usage):
+    # DeepSeek-style and OpenAI-style cache hit fields
+    if "prompt_cache_hit_tokens" in usage:
+        return usage["prompt_cache_hit_tokens"]
+    return (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+
+
+def record_call(task, model, messages, completion_text, usage=None, latency=None):
+    """Logs one chat call (console + JSONL) and adds it to the per-task totals."""
+    usage = usage or {}
+    estimated = "prompt_tokens" not in usage
+    prompt_tokens = usage.get("prompt_tokens") or estimate_message_tokens(messages)
+    completion_tokens = usage.get("completion_tokens") or estimate_tokens(completion_text or "")
+    cached_tokens = _cached_tokens(usage) or 0
+    prefill_seconds = (prompt_tokens - cached_tokens) / PREFILL_TOKENS_PER_SECOND
+
+    entry = {
+        "ts": time.time(),
+        "task": task,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "cached_prompt_tokens": cached_tokens,
+        "completion_tokens": completion_tokens,
+        "system_prefix_tokens": estimate_tokens(messages[0]["content"]) if messages else 0,
+        "estimated_prefill_seconds": round(prefill_seconds, 3),
+        "latency_seconds": round(latency, 3) if latency is not None else None,
+        "estimated": estimated,
+    }
+
+    print(f"   🔢 [{task}] {model.split('/')[-1]}: prompt {prompt_tokens}"
+          f" (cached {cached_tokens}) + completion {completion_tokens} tokens"
+          f"{' ~est' if estimated else ''}, prefill ≈ {prefill_seconds:.2f}s")
+
+    with _lock:
+        totals = _TOTALS.setdefault(task, {"calls": 0, "prompt": 0, "cached": 0, "completion": 0})
+        totals["calls"] += 1
+        totals["prompt"] += prompt_tokens
+        totals["cached"] += cached_tokens
+        totals["completion"] += completion_tokens
+        try:
+            os.makedirs(os.path.dirname(TOKEN_LOG_PATH) or ".", exist_ok=True)
+            with open(TOKEN_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"   ⚠️ Could not write token log: {e}")
+    return entry
+
+
+def reset():
+    """Clears the per-task totals (the warm daemon reports each job on its own)."""
+    with _lock:
+        _TOTALS.clear()
+
+
+def report():
+    """Prints per-task token totals and the share of prompt tokens served from cache."""
+    if not _TOTALS:
+        return
+    print(f"\n🔢 {'task':<18}{'calls':>6}{'prompt':>9}{'cached':>9}{'hit %':>7}{'completion':>12}")
+    for task, t in _TOTALS.items():
+        hit = 100 * t["cached"] / t["prompt"] if t["prompt"] else 0
+        print(f"   {task:<18}{t['calls']:>6}{t['prompt']:>9}{t['cached']:>9}{hit:>6.0f}%{t['completion']:>12}")
@@ -0,0 +1,65 @@
+import os
+import shutil
+
+# ==========================================
+# 🗄️ ASSET HAND-OFF BETWEEN NODES
+# ==========================================
+# Workers always read/write run assets under a local root (same layout as
+# LocalBot: <root>/<topic>/images, audio/<lang>, script.json, Final_Video_*).
+# - SharedDirStore: the root itself is shared (NFS/SMB mount), push/pull are no-ops.
+# - LocalObjectStore: stand-in for S3/GCS; a "bucket" directory that workers
+#   push files to and pull missing files from into their private local root.
+
+
+class SharedDirStore:
+
+    def __init__(self, root="Output"):
+        self.root = root
+
+    def run_dir(self, run_id):
+        return os.path.join(self.root, run_id)
+
+    def push(self, run_id, rel_paths):
+        pass
+
+    def pull(self, run_id, rel_paths):
+        pass
+
+
+class LocalObjectStore(SharedDirStore):
+
+    def __init__(self, bucket_dir, root="Output"):
+        super().__init__(root)
+        self.bucket_dir = bucket_dir
+
+    def _object_path(self, run_id, rel_path):
+        return os.path.join(self.bucket_dir, run_id, rel_path)
+
+    def push(self, run_id, rel_paths):
+        for rel_path in rel_paths:
+            local_path = os.path.join(self.run_dir(run_id), rel_path)
+            if not os.path.exists(local_path):
+                continue
+            object_path = self._object_path(run_id, rel_path)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            # Write-then-rename so readers never see half-uploaded objects
+            shutil.copyfile(local_path, object_path + ".part")
+            os.replace(object_path + ".part", object_path)
+
+    def pull(self, run_id, rel_paths):
+        for rel_path in rel_paths:
+            object_path = self._object_path(run_id, rel_path)
+            local_path = os.path.join(self.run_dir(run_id), rel_path)
+            if not os.path.exists(object_path):
+                continue
+            if os.path.exists(local_path) and os.path.getsize(local_path) == os.path.getsize(object_path):
+                continue
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            shutil.copyfile(object_path, local_path)
+
+
+def store_from_env():
+    """ASSET_BUCKET_DIR set → object-store stand-in, otherwise a shared directory."""
+    root = os.getenv("ASSET_ROOT", "Output")
+    bucket_dir = os.getenv("ASSET_BUCKET_DIR")
+    return LocalObjectStore(bucket_dir, root) if bucket_dir else SharedDirStore(root)
@@ -0,0 +1,67 @@
+"""
+Queue coordinator.
+
+    python -m src.worker.coordinator submit "story of job from the bible" --languages en te
+    python -m src.worker.coordinator status
+    python -m src.worker.coordinator status --watch 5
+"""
+import argparse
+import os
+import time
+
+from src.worker.task_queue import SQLiteBroker, QUEUED, RUNNING, DONE, FAILED
+from src.worker.stages import STAGES, new_job_payload
+
+
+def submit(broker, topic, languages):
+    payload = new_job_payload(None, topic, languages)
+    job_id = f"{payload['folder']}-{int(time.time())}"
+    payload["job_id"] = job_id
+    broker.enqueue("script", payload, job_id, f"{job_id}:script")
+    print(f"📬 Submitted job {job_id}")
+    return job_id
+
+
+def print_status(broker, window_seconds=600):
+    stats = broker.stats(window_seconds)
+
+    print(f"\n📊 Queue depth ({time.strftime('%H:%M:%S')})")
+    print(f"{'stage':<10}{'role':<8}{QUEUED:>8}{RUNNING:>9}{DONE:>7}{FAILED:>8}")
+    for stage, cfg in STAGES.items():
+        counts = stats["depth"].get(stage, {})
+        print(f"{stage:<10}{cfg['role']:<8}{counts.get(QUEUED, 0):>8}{counts.get(RUNNING, 0):>9}"
+              f"{counts.get(DONE, 0):>7}{counts.get(FAILED, 0):>8}")
+
+    print(f"\n👷 Workers (last {window_seconds // 60} min)")
+    print(f"{'worker':<40}{'role':<8}{'seen':>8}{'done':>6}{'fail':>6}{'task/min':>10}{'avg s':>8}")
+    now = time.time()
+    for w in stats["workers"]:
+        avg = f"{w['avg_task_seconds']:.1f}" if w["avg_task_seconds"] is not None else "-"
+        print(f"{w['worker_id'][:39]:<40}{w['role']:<8}{int(now - w['last_seen']):>7}s"
+              f"{w['done']:>6}{w['failed']:>6}{w['tasks_per_min']:>10.2f}{avg:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bible story pipeline queue coordinator.")
+    parser.add_argument("--db", default=os.getenv("QUEUE_DB", os.path.join("Output", "queue.db")))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit_cmd = commands.add_parser("submit", help="Queue a new story job")
+    submit_cmd.add_argument("topic")
+    submit_cmd.add_argument("--languages", nargs="+", default=["en"])
+
+    status_cmd = commands.add_parser("status", help="Show queue depth and worker throughput")
+    status_cmd.add_argument("--window", type=int, default=600, help="Throughput window (seconds)")
+    status_cmd.add_argument("--watch", type=float, help="Refresh every N seconds")
+
+    args = parser.parse_args()
+    broker = SQLiteBroker(args.db)
+
+    if args.command == "submit":
+        submit(broker, args.topic, args.languages)
+    else:
+        while True:
+            print_status(broker, args.window)
+            if not args.watch:
+                break
+            time.sleep(args.watch)
@@ -0,0 +1,214 @@
+"""
+Warm pipeline daemon.
+
+Keeps one process alive between story jobs, so MoviePy/numpy imports, the
+pooled HTTP session (RestAPI) and the YouTube client + OAuth credentials are
+paid for once instead of on every `python LocalBot.py`:
+
+    python -m src.worker.daemon serve                      # 127.0.0.1:8765
+    python -m src.worker.daemon submit "story of ruth" --languages en te
+
+Jobs are POSTed as JSON ({"topic": ..., "languages": [...]}) to /jobs and run
+one at a time; the response streams progress back as NDJSON lines:
+    {"event": "queued", "position": 1}
+    {"event": "log", "line": "🚀 Starting Production: 12 Segments"}
+    {"event": "done", "seconds": 412.3}       (or {"event": "error", ...} when
+                                               any language was not published)
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+
+import LocalBot
+from src.utils.model_router import ModelRouter
+from src.utils.rest_api import RestAPI
+from src.youtube_uploader import upload
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+_DONE = object()  # End-of-stream marker on a job's event queue
+
+
+class _JobOutput:
+    """
+    stdout replacement while a job runs: every printed line goes to the
+    console AND to the job's event queue. Jobs run one at a time, so swapping
+    sys.stdout globally also captures prints from the job's worker threads.
+    """
+
+    def __init__(self, console, events):
+        self.console = console
+        self.events = events
+        self._buffer = ""
+
+    def write(self, text):
+        self.console.write(text)
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            if line.strip():
+                self.events.put({"event": "log", "line": line})
+        return len(text)
+
+    def flush(self):
+        self.console.flush()
+
+
+class PipelineDaemon:
+    """Single job runner thread + a FIFO of pending jobs."""
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.running = None
+        threading.Thread(target=self._run_jobs, daemon=True).start()
+
+    @staticmethod
+    def warm_up():
+        """Opens everything a job would otherwise pay for on its first call."""
+        RestAPI.session()
+        if os.path.exists(upload.TOKEN_PATH):
+            try:
+                upload.get_youtube_client()
+                print("🔑 YouTube client ready.")
+            except Exception as e:
+                print(f"⚠️ YouTube client not warmed ({e}); uploads will retry on demand.")
+
+    def submit(self, topic, languages):
+        events = queue.Queue()
+        events.put({"event": "queued", "position": self.jobs.qsize() + (1 if self.running else 0)})
+        self.jobs.put((topic, languages, events))
+        return events
+
+    def _run_jobs(self):
+        while True:
+            topic, languages, events = self.jobs.get()
+            self.running = topic
+            console = sys.stdout
+            sys.stdout = _JobOutput(console, events)
+            start = time.perf_counter()
+            try:
+                ModelRouter.reset_stats()  # Stats/tokens are process-wide: report this job only
+                print(f"🎬 Job started: {topic} {languages}")
+                failed = asyncio.run(LocalBot.main(topic, languages))
+                seconds = round(time.perf_counter() - start, 1)
+                if failed:
+                    reasons = ", ".join(f"[{language}] {reason}" for language, reason in failed.items())
+                    events.put({"event": "error", "error": f"Not published: {reasons}",
+                                "failed": failed, "seconds": seconds})
+                else:
+                    events.put({"event": "done", "seconds": seconds})
+            except Exception as e:
+                traceback.print_exc()
+                events.put({"event": "error", "error": str(e)})
+            finally:
+                sys.stdout = console
+                self.running = None
+                events.put(_DONE)
+
+
+def make_handler(daemon):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._send_json(404, {"error": "not found"})
+            self._send_json(200, {"running": daemon.running, "queued": daemon.jobs.qsize()})
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                return self._send_json(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                job = json.loads(self.rfile.read(length) or b"{}")
+                topic = job["topic"]
+            except (ValueError, KeyError):
+                return self._send_json(400, {"error": 'expected {"topic": ..., "languages": [...]}'})
+
+            events = daemon.submit(topic, job.get("languages") or LocalBot.AUDIO_LANGUAGE)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            while True:
+                event = events.get()
+                if event is _DONE:
+                    break
+                try:
+                    self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                except OSError:
+                    # Client went away; the job keeps running, drain its events
+                    pass
+
+        def log_message(self, format, *args):
+            pass  # Keep the console for job output
+
+    return Handler
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    daemon = PipelineDaemon()
+    daemon.warm_up()
+    server = ThreadingHTTPServer((host, port), make_handler(daemon))
+    print(f"🔥 Pipeline daemon listening on http://{host}:{port} (POST /jobs, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Daemon stopped.")
+
+
+def submit(topic, languages, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Submits a job and prints its progress stream until it finishes."""
+    request = Request(
+        f"http://{host}:{port}/jobs",
+        data=json.dumps({"topic": topic, "languages": languages}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    result = None
+    with urlopen(request) as response:
+        for raw in response:
+            event = json.loads(raw)
+            if event["event"] == "log":
+                print(event["line"])
+            elif event["event"] == "queued":
+                print(f"📬 Queued (position {event['position']})")
+            else:
+                result = event
+    if result and result["event"] == "done":
+        print(f"✅ Job finished in {result['seconds']}s")
+        return True
+    print(f"❌ Job failed: {result.get('error') if result else 'connection closed'}")
+    return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm Bible story pipeline daemon.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="Run the daemon")
+    submit_cmd = sub.add_parser("submit", help="Send a story job and stream its progress")
+    submit_cmd.add_argument("topic")
+    submit_cmd.add_argument("--languages", nargs="+", default=["en"])
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.host, args.port)
+    else:
+        sys.exit(0 if submit(args.topic, args.languages, args.host, args.port) else 1)
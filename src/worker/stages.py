@@ -0,0 +1,214 @@
+import os
+import json
+import asyncio
+import random
+
+import LocalBot
+from src.worker.task_queue import DONE, FAILED
+from src.story_generator import StoryGenerator
+from src.audion_generation.AudioGenerator import AudioGenerator
+from src.utils import Utils
+from src.youtube_uploader import upload
+
+# ==========================================
+# 🧩 PIPELINE STAGES AS QUEUE TASKS
+# ==========================================
+# script ──► audio (one task per language) ─┐
+#        ├─► image (one task per segment) ──┴─► render (per language) ──► upload
+#        └─► metadata (all languages, one request) ─────────────────────────┘
+#
+# Every payload carries {"job_id", "topic", "languages", "folder"}.
+# "api" stages are network-bound, "render" is CPU-bound (MoviePy/x264).
+API, RENDER = "api", "render"
+
+
+def new_job_payload(job_id, topic, languages):
+    return {
+        "job_id": job_id,
+        "topic": topic,
+        "languages": list(languages),
+        "folder": LocalBot.safe_topic_name(topic),
+    }
+
+
+def _folders(payload, store):
+    return LocalBot.setup_folders(payload["topic"], payload["languages"], root=store.root)
+
+
+def _load_segments(payload, store):
+    store.pull(payload["folder"], ["script.json"])
+    base_dir = store.run_dir(payload["folder"])
+    with open(os.path.join(base_dir, "script.json"), "r", encoding="utf-8") as f:
+        script = json.load(f)
+    all_segments, anchors = LocalBot.flatten_script(script)
+    return script, all_segments, anchors
+
+
+def _image_rel(i):
+    return os.path.join("images", f"image_{i}.png")
+
+
+def _audio_rel(i, language):
+    return os.path.join("audio", language, AudioGenerator.audio_filename(i, language))
+
+
+# ------------------------------------------
+# Handlers
+# ------------------------------------------
+def handle_script(task, broker, store):
+    payload = task["payload"]
+    job_id = task["run_id"]
+    base_dir, _, _ = _folders(payload, store)
+
+    store.pull(payload["folder"], ["script.json"])
+    script = LocalBot.load_or_generate_script(base_dir, payload["topic"], payload["languages"])
+    if not script:
+        raise RuntimeError("Script generation failed")
+    store.push(payload["folder"], ["script.json"])
+
+    all_segments, _ = LocalBot.flatten_script(script)
+    seed = random.randint(1, 999999)
+
+    # One transaction, so no fan-in check can run before every asset task exists.
+    # Metadata goes first: it is one short request and must be ready before upload.
+    # segment_count lets the fan-in compare DONE tasks against the expected total.
+    asset_payload = {**payload, "segment_count": len(all_segments)}
+    tasks = [("metadata", payload, job_id, f"{job_id}:metadata")]
+    tasks += [
+        ("audio", {**asset_payload, "language": language}, job_id, f"{job_id}:audio:{language}")
+        for language in payload["languages"]
+    ]
+    tasks += [
+        ("image", {**asset_payload, "index": i, "seed": seed}, job_id, f"{job_id}:image:{i}")
+        for i in range(len(all_segments))
+    ]
+    broker.enqueue_many(tasks)
+    print(f"📬 [{job_id}] Queued {len(tasks)} asset tasks")
+
+
+def handle_audio(task, broker, store):
+    payload = task["payload"]
+    language = payload["language"]
+    _, _, aud_dir = _folders(payload, store)
+    _, all_segments, _ = _load_segments(payload, store)
+
+    rel_paths = [_audio_rel(i, language) for i in range(len(all_segments))]
+    store.pull(payload["folder"], rel_paths)
+
+    audio_jobs = LocalBot.audio_jobs_for(all_segments, aud_dir, language)
+    results = asyncio.run(AudioGenerator.generate_many(audio_jobs, language))
+    store.push(payload["folder"], rel_paths)
+
+    if not all(results):
+        raise RuntimeError(f"{results.count(False)} {language} segments failed")
+
+
+def handle_image(task, broker, store):
+    payload = task["payload"]
+    i = payload["index"]
+    _, img_dir, _ = _folders(payload, store)
+    _, all_segments, anchors = _load_segments(payload, store)
+
+    rel_paths = [_image_rel(i), LocalBot.failure_marker(_image_rel(i))]
+    store.pull(payload["folder"], rel_paths)
+    img_path = os.path.join(img_dir, f"image_{i}.png")
+    if not LocalBot.is_cached(img_path):
+        # The shared near-duplicate index is single-writer, so workers skip it
+        LocalBot.generate_segment_image(all_segments[i], anchors, img_path, payload["seed"])
+    store.push(payload["folder"], rel_paths)
+
+
+def handle_metadata(task, broker, store):
+    payload = task["payload"]
+    base_dir, _, _ = _folders(payload, store)
+    script, _, _ = _load_segments(payload, store)
+
+    store.pull(payload["folder"], ["metadata.json"])
+    LocalBot.load_or_generate_metadata(base_dir, payload["topic"], script, payload["languages"])
+    store.push(payload["folder"], ["metadata.json"])
+
+
+def stop_job(task, broker, store):
+    """A render input failed for good: cancel the rest of the job instead of rendering gaps."""
+    cancelled = broker.cancel_run(task["run_id"], f"{task['stage']} #{task['id']} failed")
+    print(f"🛑 [{task['run_id']}] Job stopped ({task['stage']} failed), {cancelled} queued task(s) cancelled")
+
+
+def enqueue_renders_when_ready(task, broker, store):
+    """
+    Fan-in: a language renders once EVERY image and that language's audio are
+    DONE (not merely no longer open: failed tasks never count as done).
+    """
+    payload = task["payload"]
+    job_id = task["run_id"]
+    images = broker.state_counts(job_id, "image")
+    audio = {language: broker.state_counts(job_id, "audio", f"{job_id}:audio:{language}")
+             for language in payload["languages"]}
+    if images.get(FAILED) or any(counts.get(FAILED) for counts in audio.values()):
+        stop_job(task, broker, store)
+        return
+    if images.get(DONE, 0) < payload["segment_count"]:
+        return
+
+    for language in payload["languages"]:
+        if audio[language].get(DONE, 0) == 1:
+            render_payload = {k: payload[k] for k in ("job_id", "topic", "languages", "folder")}
+            if broker.enqueue("render", {**render_payload, "language": language},
+                              job_id, f"{job_id}:render:{language}"):
+                print(f"📬 [{job_id}] Render queued for [{language}]")
+
+
+def handle_render(task, broker, store):
+    payload = task["payload"]
+    language = payload["language"]
+    base_dir, img_dir, aud_dir = _folders(payload, store)
+    _, all_segments, _ = _load_segments(payload, store)
+
+    store.pull(payload["folder"], [_image_rel(i) for i in range(len(all_segments))])
+    store.pull(payload["folder"], [_audio_rel(i, language) for i in range(len(all_segments))])
+
+    video_clips = LocalBot.build_video_clips(len(all_segments), img_dir, aud_dir, language)
+    output_path = Utils.assemble_video(video_clips, base_dir, language)
+    store.push(payload["folder"], [os.path.relpath(output_path, base_dir)])
+
+    broker.enqueue("upload", {**payload, "video": os.path.relpath(output_path, base_dir)},
+                   task["run_id"], f"{task['run_id']}:upload:{language}")
+
+
+def handle_upload(task, broker, store):
+    payload = task["payload"]
+    language = payload["language"]
+    base_dir, _, aud_dir = _folders(payload, store)
+    script, _, _ = _load_segments(payload, store)
+
+    store.pull(payload["folder"], [payload["video"], "metadata.json"])
+    metadata_path = os.path.join(base_dir, "metadata.json")
+    meta_data = None
+    if os.path.exists(metadata_path):
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            meta_data = json.load(f).get(language)
+    if not meta_data:
+        # Metadata task not finished (or failed): generate just this language
+        meta_data = StoryGenerator.generate_video_metadata(payload["topic"], script, language)
+    if not meta_data:
+        raise RuntimeError("Metadata generation failed")
+    with open(os.path.join(aud_dir, language, "meta_data_debug.txt"), "w", encoding="utf-8") as f:
+        json.dump(meta_data, f, indent=4)
+
+    if upload.upload_video_to_youtube(os.path.join(base_dir, payload["video"]), meta_data) is None:
+        raise RuntimeError("YouTube upload failed")
+
+
+# "lease": seconds before a task whose worker stopped renewing it (crash, kill,
+# lost node) is handed to another worker. The worker renews it every lease/3
+# while the handler runs, so it bounds crash recovery, not the task's runtime.
+STAGES = {
+    "script": {"role": API, "handler": handle_script, "lease": 300},
+    "audio": {"role": API, "handler": handle_audio, "after": enqueue_renders_when_ready,
+              "on_failed": stop_job, "lease": 300},
+    "image": {"role": API, "handler": handle_image, "after": enqueue_renders_when_ready,
+              "on_failed": stop_job, "lease": 300},
+    "metadata": {"role": API, "handler": handle_metadata, "lease": 300},
+    "render": {"role": RENDER, "handler": handle_render, "lease": 600},
+    "upload": {"role": API, "handler": handle_upload, "lease": 600},
+}
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+
+# ==========================================
+# 📬 DURABLE TASK QUEUE
+# ==========================================
+# Pipeline stages are tasks on a queue so API-bound workers (script, TTS,
+# images, upload) and CPU-bound render workers can run on different nodes.
+# Broker is the pluggable interface; SQLiteBroker is the local implementation
+# for workers on ONE host (several processes sharing the db file). SQLite
+# locking is unreliable on network filesystems, so for workers on several
+# nodes swap in a Redis/SQS/... broker that implements the same methods.
+# WAL journaling (QUEUE_WAL=1) speeds up concurrent readers on a single host
+# only; it never works on a network filesystem.
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def default_worker_id(role):
+    return f"{socket.gethostname()}-{os.getpid()}-{role}"
+
+
+class Broker:
+    """
+    Interface every queue backend implements. Tasks are plain dicts:
+    {"id", "stage", "run_id", "payload", "attempts", "max_attempts", "worker_id"}
+    """
+
+    def enqueue(self, stage, payload, run_id=None, dedupe_key=None, max_attempts=3):
+        """Adds a task. Returns its id, or None if dedupe_key was already enqueued."""
+        raise NotImplementedError
+
+    def enqueue_many(self, tasks):
+        """Atomically adds [(stage, payload, run_id, dedupe_key), ...]."""
+        raise NotImplementedError
+
+    def claim(self, stages, worker_id, lease_seconds=600):
+        """
+        Atomically takes the oldest queued (or lease-expired) task of the given stages.
+        lease_seconds is one value for every stage or {stage: seconds}.
+        Lease-expired tasks that already used all their attempts (the worker died
+        on every try) are marked failed instead of being retried forever.
+        """
+        raise NotImplementedError
+
+    def renew_lease(self, task, lease_seconds):
+        """
+        Extends a running task's lease (and its worker's last_seen). Called from
+        the worker's lease keeper thread. Returns False if the task is no longer
+        held by task["worker_id"].
+        """
+        raise NotImplementedError
+
+    def complete(self, task):
+        raise NotImplementedError
+
+    def fail(self, task, error):
+        """Re-queues the task until max_attempts is reached, then marks it failed."""
+        raise NotImplementedError
+
+    def state_counts(self, run_id, stage, dedupe_key=None):
+        """{state: n} for the tasks of a stage in a run (fan-in checks)."""
+        raise NotImplementedError
+
+    def cancel_run(self, run_id, reason):
+        """Marks every still-queued task of a run failed. Returns how many were cancelled."""
+        raise NotImplementedError
+
+    def heartbeat(self, worker_id, role):
+        raise NotImplementedError
+
+    def stats(self, window_seconds=600):
+        """{"depth": {stage: {state: n}}, "workers": [...]} for the coordinator."""
+        raise NotImplementedError
+
+
+class SQLiteBroker(Broker):
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stage TEXT NOT NULL,
+            run_id TEXT,
+            payload TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'queued',
+            dedupe_key TEXT UNIQUE,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            worker_id TEXT,
+            lease_until REAL,
+            error TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks (state, stage, id);
+        CREATE INDEX IF NOT EXISTS idx_tasks_run ON tasks (run_id, stage, state);
+        CREATE TABLE IF NOT EXISTS workers (
+            worker_id TEXT PRIMARY KEY,
+            role TEXT,
+            last_seen REAL
+        );
+    """
+
+    def __init__(self, db_path=os.path.join("Output", "queue.db"), wal=None):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        if wal if wal is not None else os.getenv("QUEUE_WAL") == "1":
+            # Single host only: WAL needs shared memory between all processes using the db
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+        self._local = threading.local()  # sqlite3 connections can't cross threads (renew_lease)
+
+    @staticmethod
+    def _to_task(row):
+        return {
+            "id": row["id"],
+            "stage": row["stage"],
+            "run_id": row["run_id"],
+            "payload": json.loads(row["payload"]),
+            "attempts": row["attempts"],
+            "max_attempts": row["max_attempts"],
+            "worker_id": row["worker_id"],
+        }
+
+    def enqueue(self, stage, payload, run_id=None, dedupe_key=None, max_attempts=3):
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO tasks (stage, run_id, payload, dedupe_key, max_attempts, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (stage, run_id, json.dumps(payload, ensure_ascii=False), dedupe_key, max_attempts, time.time())
+        )
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def enqueue_many(self, tasks):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [self.enqueue(stage, payload, run_id, dedupe_key)
+                   for stage, payload, run_id, dedupe_key in tasks]
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return ids
+
+    def claim(self, stages, worker_id, lease_seconds=600):
+        now = time.time()
+        placeholders = ",".join("?" for _ in stages)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = self.conn.execute(
+                f"UPDATE tasks SET state = ?, finished_at = ?, "
+                f"error = 'lease expired on every attempt (worker crashed or was killed)' "
+                f"WHERE stage IN ({placeholders}) AND state = ? AND lease_until < ? "
+                f"AND attempts >= max_attempts",
+                (FAILED, now, *stages, RUNNING, now)
+            ).rowcount
+            if expired:
+                print(f"💀 {expired} task(s) failed after their last attempt's lease expired")
+
+            row = self.conn.execute(
+                f"SELECT * FROM tasks WHERE stage IN ({placeholders}) AND "
+                f"(state = ? OR (state = ? AND lease_until < ?)) ORDER BY id LIMIT 1",
+                (*stages, QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+
+            lease = lease_seconds.get(row["stage"], 600) if isinstance(lease_seconds, dict) else lease_seconds
+            self.conn.execute(
+                "UPDATE tasks SET state = ?, worker_id = ?, lease_until = ?, "
+                "attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (RUNNING, worker_id, now + lease, now, row["id"])
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        task = self._to_task(row)
+        task["attempts"] += 1
+        task["worker_id"] = worker_id
+        return task
+
+    def renew_lease(self, task, lease_seconds):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        now = time.time()
+        renewed = conn.execute(
+            "UPDATE tasks SET lease_until = ? WHERE id = ? AND state = ? AND worker_id = ?",
+            (now + lease_seconds, task["id"], RUNNING, task["worker_id"])
+        ).rowcount == 1
+        conn.execute("UPDATE workers SET last_seen = ? WHERE worker_id = ?", (now, task["worker_id"]))
+        return renewed
+
+    def complete(self, task):
+        self.conn.execute(
+            "UPDATE tasks SET state = ?, finished_at = ?, error = NULL WHERE id = ?",
+            (DONE, time.time(), task["id"])
+        )
+
+    def fail(self, task, error):
+        state = FAILED if task["attempts"] >= task["max_attempts"] else QUEUED
+        self.conn.execute(
+            "UPDATE tasks SET state = ?, finished_at = ?, error = ? WHERE id = ?",
+            (state, time.time(), str(error)[:2000], task["id"])
+        )
+        return state
+
+    def state_counts(self, run_id, stage, dedupe_key=None):
+        query = "SELECT state, COUNT(*) AS n FROM tasks WHERE run_id = ? AND stage = ?"
+        params = [run_id, stage]
+        if dedupe_key is not None:
+            query += " AND dedupe_key = ?"
+            params.append(dedupe_key)
+        query += " GROUP BY state"
+        return {row["state"]: row["n"] for row in self.conn.execute(query, params)}
+
+    def cancel_run(self, run_id, reason):
+        return self.conn.execute(
+            "UPDATE tasks SET state = ?, finished_at = ?, error = ? WHERE run_id = ? AND state = ?",
+            (FAILED, time.time(), f"cancelled: {reason}"[:2000], run_id, QUEUED)
+        ).rowcount
+
+    def heartbeat(self, worker_id, role):
+        self.conn.execute(
+            "INSERT INTO workers (worker_id, role, last_seen) VALUES (?, ?, ?) "
+            "ON CONFLICT(worker_id) DO UPDATE SET role = excluded.role, last_seen = excluded.last_seen",
+            (worker_id, role, time.time())
+        )
+
+    def stats(self, window_seconds=600):
+        depth = {}
+        for row in self.conn.execute("SELECT stage, state, COUNT(*) AS n FROM tasks GROUP BY stage, state"):
+            depth.setdefault(row["stage"], {})[row["state"]] = row["n"]
+
+        since = time.time() - window_seconds
+        workers = []
+        for w in self.conn.execute("SELECT * FROM workers ORDER BY worker_id"):
+            row = self.conn.execute(
+                "SELECT COUNT(*) AS n, AVG(finished_at - started_at) AS avg_s FROM tasks "
+                "WHERE worker_id = ? AND state = ? AND finished_at >= ?",
+                (w["worker_id"], DONE, since)
+            ).fetchone()
+            failed = self.conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE worker_id = ? AND state = ? AND finished_at >= ?",
+                (w["worker_id"], FAILED, since)
+            ).fetchone()[0]
+            workers.append({
+                "worker_id": w["worker_id"],
+                "role": w["role"],
+                "last_seen": w["last_seen"],
+                "done": row["n"],
+                "failed": failed,
+                "tasks_per_min": row["n"] / (window_seconds / 60),
+                "avg_task_seconds": row["avg_s"],
+            })
+        return {"depth": depth, "workers": workers}
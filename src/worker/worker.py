@@ -0,0 +1,94 @@
+"""
+Queue worker.
+
+Run API workers (script, TTS, images, upload) and render workers on whichever
+nodes suit them, all pointed at the same queue and asset store:
+
+    python -m src.worker.worker --role api
+    python -m src.worker.worker --role render
+    python -m src.worker.worker --role all --burst     # single box, exit when idle
+
+Env: ASSET_ROOT (local asset root, default Output), ASSET_BUCKET_DIR (object-store stand-in).
+"""
+import argparse
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from src.worker.task_queue import SQLiteBroker, FAILED, default_worker_id
+from src.worker.asset_store import store_from_env
+from src.worker.stages import STAGES
+
+
+@contextmanager
+def lease_kept(broker, task, lease_seconds):
+    """Renews the task's lease every lease_seconds/3 while the block (its handler) runs."""
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(lease_seconds / 3):
+            try:
+                if not broker.renew_lease(task, lease_seconds):
+                    print(f"⚠️ Lost the lease on {task['stage']} #{task['id']} (reclaimed by another worker)")
+                    return
+            except Exception as e:
+                print(f"⚠️ Could not renew the lease on {task['stage']} #{task['id']}: {e}")
+
+    keeper = threading.Thread(target=renew, daemon=True)
+    keeper.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        keeper.join()
+
+
+def run_worker(role, broker, store, worker_id=None, poll_interval=2.0, burst=False):
+    stages = [name for name, cfg in STAGES.items() if role == "all" or cfg["role"] == role]
+    leases = {name: STAGES[name]["lease"] for name in stages}
+    worker_id = worker_id or default_worker_id(role)
+    print(f"👷 Worker {worker_id} serving stages: {', '.join(stages)}")
+
+    while True:
+        broker.heartbeat(worker_id, role)
+        task = broker.claim(stages, worker_id, leases)
+        if task is None:
+            if burst:
+                print("💤 Queue empty, exiting.")
+                return
+            time.sleep(poll_interval)
+            continue
+
+        stage = STAGES[task["stage"]]
+        print(f"\n▶️ [{task['run_id']}] {task['stage']} #{task['id']} (attempt {task['attempts']})")
+        start = time.perf_counter()
+        try:
+            with lease_kept(broker, task, leases[task["stage"]]):
+                stage["handler"](task, broker, store)
+        except Exception as e:
+            traceback.print_exc()
+            state = broker.fail(task, e)
+            print(f"❌ {task['stage']} #{task['id']} failed → {state}")
+            if state == FAILED and "on_failed" in stage:
+                stage["on_failed"](task, broker, store)
+            continue
+
+        broker.complete(task)
+        print(f"✅ {task['stage']} #{task['id']} done in {time.perf_counter() - start:.1f}s")
+        if "after" in stage:
+            stage["after"](task, broker, store)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bible story pipeline queue worker.")
+    parser.add_argument("--role", choices=["api", "render", "all"], default="all")
+    parser.add_argument("--db", default=os.getenv("QUEUE_DB", os.path.join("Output", "queue.db")))
+    parser.add_argument("--worker-id")
+    parser.add_argument("--poll", type=float, default=2.0, help="Idle poll interval (seconds)")
+    parser.add_argument("--burst", action="store_true", help="Exit once the queue is empty")
+    args = parser.parse_args()
+
+    run_worker(args.role, SQLiteBroker(args.db), store_from_env(),
+               worker_id=args.worker_id, poll_interval=args.poll, burst=args.burst)
@@ -2,15 +2,36 @@
 # ⚠️ Prerequisite: You must have 'token.json' in your Drive folder.
 
 import os
+from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 
+# Path to your token file in Drive
+TOKEN_PATH = "src\\youtube_uploader\\token.json"
+
+# The client is built once per process: the discovery document comes from the
+# copy bundled with google-api-python-client (no network fetch) and token.json
+# is read once, with the access token refreshed in place when it expires.
+_YOUTUBE_CLIENT = None
+_CREDENTIALS = None
+
+
+def get_youtube_client():
+    global _YOUTUBE_CLIENT, _CREDENTIALS
+
+    if _CREDENTIALS is None:
+        _CREDENTIALS = Credentials.from_authorized_user_file(TOKEN_PATH)
+    if not _CREDENTIALS.valid and _CREDENTIALS.refresh_token:
+        _CREDENTIALS.refresh(Request())
+
+    if _YOUTUBE_CLIENT is None:
+        _YOUTUBE_CLIENT = build('youtube', 'v3', credentials=_CREDENTIALS,
+                                static_discovery=True, cache_discovery=False)
+    return _YOUTUBE_CLIENT
+
 
 def upload_video_to_youtube(video_file_path, meta_data):
-    
-    # Path to your token file in Drive
-    TOKEN_PATH = "src\\youtube_uploader\\token.json" 
 
     # Metadata for the video
     VIDEO_TITLE = meta_data.get("title")
@@ -30,8 +51,7 @@ def upload_video_to_youtube(video_file_path, meta_data):
 
     print("🔑 Authenticating with YouTube...")
     try:
-        creds = Credentials.from_authorized_user_file(TOKEN_PATH)
-        youtube = build('youtube', 'v3', credentials=creds)
+        youtube = get_youtube_client()
     except Exception as e:
         print(f"❌ Auth Failed: {e}")
         print("Try re-generating token.json locally.")
@@ -68,4 +88,5 @@ def upload_video_to_youtube(video_file_path, meta_data):
             print(f"   🚀 Uploading... {int(status.progress() * 100)}%")
             
     print(f"✅ Upload Complete! Video ID: {response.get('id')}")
-    print(f"🔗 Link: https://youtu.be/{response.get('id')}")
\ No newline at end of file
+    print(f"🔗 Link: https://youtu.be/{response.get('id')}")
+    return response.get('id')
\ No newline at end of file